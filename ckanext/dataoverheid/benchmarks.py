@@ -0,0 +1,516 @@
+# encoding: utf-8
+
+
+import json
+import os
+import timeit
+from collections import defaultdict
+import ckan.model as model
+import ckan.plugins as plugins
+import ckan.plugins.toolkit as tk
+import ckanext.dataoverheid.logic.validators as validators
+import ckanext.dataoverheid.logic.helpers.transformers as transformers
+from ckanext.dataoverheid.logic.helpers.config import get_config, get_list
+from ckanext.dataoverheid.logic.rdf.graph_builder import \
+    DatasetDCATGraphBuilder
+from rdflib import Graph
+
+
+def validation(iterations, context):
+    """
+    Benchmarks the validation performed by `package_create` against the create
+    schema of the `donl-scheme` plug-in. The validation is measured with a
+    schema that is built on every call and with the schema that is cached per
+    config version. Both schemas hold the validators of the current code, so
+    the difference is the cost of building the schema; it is not the gain
+    over the release before the schemas were cached, whose validators also
+    resolved their config while validating. No durations of that release
+    were recorded for this suite.
+
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] context: The CKAN context to validate with
+    :rtype: list of (str, float)
+    :return: The label and average duration in seconds of each benchmark
+    """
+    plugin = plugins.get_plugin('donl-scheme')
+    package = _sample_package()
+
+    def uncached():
+        tk.navl_validate(package, plugin._create_package_schema(),
+                         dict(context))
+
+    def cached():
+        tk.navl_validate(package, plugin.create_package_schema(),
+                         dict(context))
+
+    return [
+        ('schema built per call', _measure(uncached, iterations)),
+        ('schema cached per config version', _measure(cached, iterations))
+    ]
+
+
+def spatial(iterations, context):
+    """
+    Benchmarks the validation of lists of spatial values of increasing size,
+    mixing regex based and list based spatial schemes.
+
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] context: Not used
+    :rtype: list of (str, float)
+    :return: The label and average duration in seconds of each benchmark
+    """
+    schemes = [
+        'http://standaarden.overheid.nl/owms/4.0/doc/syntax-codeerschemas/'
+        'overheid.postcodehuisnummer',
+        'http://standaarden.overheid.nl/owms/4.0/doc/syntax-codeerschemas/'
+        'overheid.epsg28992',
+        'http://standaarden.overheid.nl/owms/4.0/doc/waardelijsten/'
+        'overheid.gemeente'
+    ]
+    scheme_values = ['1234AB', '155000 463000',
+                     sorted(get_list('Overheid:SpatialGemeente',
+                                     'vocabulary'))[0]]
+    results = []
+
+    for size in [10, 100, 1000]:
+        spatial_schemes = [schemes[idx % 3] for idx in xrange(size)]
+        spatial_values = [scheme_values[idx % 3] for idx in xrange(size)]
+
+        results.append(('spatial_errors, {0} values'.format(size), _measure(
+            lambda: validators.spatial_errors(spatial_schemes, spatial_values),
+            iterations
+        )))
+
+    return results
+
+
+def communities(iterations, context):
+    """
+    Benchmarks the classification of a package into the communities of the
+    config by `extract_communities`. The lookup in the community index is also
+    measured for synthetic community configs of increasing size.
+
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] context: Not used
+    :rtype: list of (str, float)
+    :return: The label and average duration in seconds of each benchmark
+    """
+    community = get_config('validation')['communities'][0]
+    data = {
+        ('authority',): community['rules']['authority'][0],
+        ('theme',): ['theme-3', 'theme-11', 'theme-42'],
+        ('basis_register',): True,
+        ('tags', 0, 'name'): 'tag-5',
+        ('tags', 1, 'name'): 'tag-8'
+    }
+    results = [('config communities', _measure(
+        lambda: validators.extract_communities(None, dict(data),
+                                               defaultdict(list), {}),
+        iterations
+    ))]
+
+    for size in [10, 100, 1000]:
+        synthetic = [{
+            'uri': 'https://data.overheid.nl/communities/{0}'.format(idx),
+            'rules': {
+                'authority': ['authority-{0}'.format(idx * 10 + value)
+                              for value in xrange(10)],
+                'theme': ['theme-{0}'.format(idx * 10 + value)
+                          for value in xrange(10)],
+                'basis_register': idx % 2 == 0
+            },
+            'tags': ['tag-{0}'.format(idx)]
+        } for idx in xrange(size)]
+        index = validators.build_community_index(synthetic)
+
+        results.append(('indexed, {0} communities'.format(size), _measure(
+            lambda: validators.classify_communities(data, ['tag-5', 'tag-8'],
+                                                    index),
+            iterations
+        )))
+
+    return results
+
+
+def cross_field(iterations, context):
+    """
+    Benchmarks the `date_planned` and `rights` cross-field rules, compiled
+    into rules which are evaluated in a single pass.
+
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] context: Not used
+    :rtype: list of (str, float)
+    :return: The label and average duration in seconds of each benchmark
+    """
+    validation_config = get_config('validation')
+    data = {
+        ('dataset_status',): validation_config['available_uri'],
+        ('access_rights',): validation_config['public_uri'],
+        ('license_id',): validation_config['non_open_licenses'][-1],
+        ('date_planned',): '2020-01-01T00:00:00'
+    }
+
+    return [('date_planned and rights', _measure(
+        lambda: validators.cross_field(None, data, defaultdict(list), {}),
+        iterations
+    ))]
+
+
+def indexing(iterations, context):
+    """
+    Benchmarks the transformations performed by `before_index` for packages
+    with an increasing amount of resources, according to the compiled
+    transformation plan. Since the transformations modify the package, each
+    call transforms a shallow copy; the duration of copying is measured
+    separately.
+
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] context: Not used
+    :rtype: list of (str, float)
+    :return: The label and average duration in seconds of each benchmark
+    """
+    results = []
+
+    for size in [10, 100, 500]:
+        package = _index_package(size)
+
+        def copy():
+            return dict(package, resources=[dict(resource) for resource
+                                            in package['resources']])
+
+        results.append(('copy only, {0} resources'.format(size), _measure(
+            copy, iterations
+        )))
+        results.append(('transform, {0} resources'.format(size), _measure(
+            lambda: transformers.transform_multivalued_properties(copy()),
+            iterations
+        )))
+
+    return results
+
+
+def show(iterations, context):
+    """
+    Benchmarks the removal of properties performed by `after_show` for
+    packages with an increasing amount of resources, tags and groups,
+    according to the removal plan. Since the removal modifies the package,
+    each call modifies a shallow copy; the duration of copying is measured
+    separately.
+
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] context: Not used
+    :rtype: list of (str, float)
+    :return: The label and average duration in seconds of each benchmark
+    """
+    results = []
+
+    for size in [10, 100, 500]:
+        package = _show_package(size)
+
+        def copy():
+            return dict(package, **{key: [dict(item) for item in package[key]]
+                                    for key in ['resources', 'tags',
+                                                'groups']})
+
+        results.append(('copy only, {0} items'.format(size), _measure(
+            copy, iterations
+        )))
+        results.append(('remove properties, {0} items'.format(size), _measure(
+            lambda: transformers.remove_properties(copy()), iterations
+        )))
+
+    return results
+
+
+def graphs(iterations, context):
+    """
+    Benchmarks the building of the DCAT-AP-DONL Graph of a typical package and
+    of packages with many resources, according to the compiled mapping plans.
+    The amount of Graphs built per second is the inverse of the reported
+    duration. The creation of a builder itself is measured separately.
+
+    Building and serializing a Graph, as is done by `rdf_package_show`, is
+    measured with the triples collected in a `TripleBuffer` and serialized by
+    the writers of this extension, and with the triples collected in a rdflib
+    Graph and serialized by rdflib. JSON-LD is only measured with the writers,
+    since rdflib 4.2.2 has no JSON-LD serializer of its own.
+
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] context: Not used
+    :rtype: list of (str, float)
+    :return: The label and average duration in seconds of each benchmark
+    """
+    results = [('create builder', _measure(
+        lambda: DatasetDCATGraphBuilder('donl-benchmark'), iterations
+    ))]
+
+    for size in [2, 50, 250]:
+        package = _graph_package(size)
+
+        results.append(('build, {0} resources'.format(size), _measure(
+            lambda: DatasetDCATGraphBuilder(package['name'])
+            .parse_ckan_package(package),
+            iterations
+        )))
+
+        for output in ['xml', 'n3', 'nt', 'json-ld']:
+            results.append((
+                'build and serialize as {0}, {1} resources'
+                .format(output, size),
+                _measure(lambda: _serialize(package, output, None), iterations)
+            ))
+
+            if output in rdflib_outputs:
+                results.append((
+                    'build and serialize as {0} with rdflib, {1} resources'
+                    .format(output, size),
+                    _measure(lambda: _serialize(package, output, Graph()),
+                             iterations)
+                ))
+
+    return results
+
+
+def run(suite_names, iterations, site_user):
+    """
+    Runs the given benchmark suites.
+
+    :param list of str suite_names: The names of the suites to run
+    :param int iterations: The amount of times to run each benchmark
+    :param dict[str, Any] site_user: The CKAN site user
+    :rtype: list of (str, str, float)
+    :return: The suite, label and average duration in seconds of each benchmark
+    """
+    context = {
+        'model': model,
+        'session': model.Session,
+        'user': site_user['name'],
+        'ignore_auth': True
+    }
+
+    return [(name, label, duration)
+            for name in suite_names
+            for label, duration in suites[name](iterations, context)]
+
+
+def compare(results, recorded):
+    """
+    Pairs the results of `run()` with the durations recorded for the same
+    benchmarks, see `load()`.
+
+    :param list of (str, str, float) results: The results to compare
+    :param dict[str, dict[str, float]] recorded: The recorded durations in
+                                                  seconds, keyed by suite and
+                                                  label
+    :rtype: list of (str, str, float, float|None)
+    :return: The suite, label, average duration and recorded duration of each
+             benchmark; the recorded duration is None when it was not recorded
+    """
+    return [(suite, label, duration, recorded.get(suite, {}).get(label))
+            for suite, label, duration in results]
+
+
+def load(path=None):
+    """
+    Loads the durations recorded by `record()`. Unless specified otherwise,
+    the durations recorded for the release before the performance work on
+    this extension are loaded, see `baseline_path`.
+
+    :param str path: The path of the recorded durations
+    :rtype: dict[str, dict[str, float]]
+    :return: The recorded durations in seconds, keyed by suite and label
+    """
+    with open(path or baseline_path, 'r') as recorded_file:
+        return json.load(recorded_file)['results']
+
+
+def record(results, iterations, path):
+    """
+    Records the results of `run()`, so that later runs can be compared
+    against them.
+
+    :param list of (str, str, float) results: The results to record
+    :param int iterations: The amount of times each benchmark was run
+    :param str path: The path to record the durations at
+    :rtype: None
+    """
+    recorded = {}
+    [recorded.setdefault(suite, {}).__setitem__(label, duration)
+     for suite, label, duration in results]
+
+    with open(path, 'w') as recorded_file:
+        json.dump({'iterations': iterations, 'results': recorded},
+                  recorded_file, indent=2, separators=(',', ': '),
+                  sort_keys=True)
+
+
+def _measure(func, iterations):
+    """
+    Measures the average duration of a given function. The function is called
+    once before measuring to warm up any caches.
+
+    :param function func: The function to measure
+    :param int iterations: The amount of times to call the function
+    :rtype: float
+    :return: The average duration in seconds
+    """
+    func()
+    start = timeit.default_timer()
+
+    for _ in xrange(iterations):
+        func()
+
+    return (timeit.default_timer() - start) / iterations
+
+
+def _index_package(resource_count):
+    """
+    Creates a package as it is received by `before_index`, with its
+    multivalued properties stored as strings.
+
+    :param int resource_count: The amount of resources to add
+    :rtype: dict[str, Any]
+    :return: The package
+    """
+    transformations = get_config('transformations')
+    package = {prop: '{https://data.overheid.nl/1,https://data.overheid.nl/2}'
+               for prop in transformations['package']['multi_valued']}
+    package.update({prop: '2020-01-01T00:00:00'
+                    for prop in transformations['package']['date']})
+    resource = {prop: '{https://data.overheid.nl/1,https://data.overheid.nl/2}'
+                for prop in transformations['resource']['multi_valued']}
+    resource.update({prop: '2020-01-01T00:00:00'
+                     for prop in transformations['resource']['date']})
+    package['resources'] = [dict(resource) for _ in xrange(resource_count)]
+
+    return package
+
+
+def _show_package(item_count):
+    """
+    Creates a package as it is received by `after_show`, with the given amount
+    of resources, tags and groups.
+
+    :param int item_count: The amount of resources, tags and groups to add
+    :rtype: dict[str, Any]
+    :return: The package
+    """
+    properties_to_remove = get_config('properties_to_remove')
+    package = {prop: '' for prop in properties_to_remove['package']}
+    package.update({
+        'name': 'donl-benchmark',
+        'organization': {'name': 'donl', 'title': 'DONL'},
+        'resources': [{'id': str(idx), 'name': 'Resource {0}'.format(idx),
+                       'url': 'https://data.overheid.nl/{0}.csv'.format(idx)}
+                      for idx in xrange(item_count)],
+        'tags': [{'id': str(idx), 'name': 'tag-{0}'.format(idx)}
+                 for idx in xrange(item_count)],
+        'groups': [{'id': str(idx), 'name': 'group-{0}'.format(idx)}
+                   for idx in xrange(item_count)]
+    })
+
+    return package
+
+
+def _serialize(package, output, graph):
+    """
+    Builds the Graph of a package and serializes it.
+
+    :param dict[str, Any] package: The package
+    :param str output: The output format
+    :param Graph graph: The rdflib Graph to collect the triples in, if any
+    :rtype: str
+    :return: The serialized Graph
+    """
+    builder = DatasetDCATGraphBuilder(package['name'], graph)
+    builder.parse_ckan_package(package)
+
+    return builder.as_(output)
+
+
+def _graph_package(resource_count):
+    """
+    Creates a package as it is received by `package_as_rdf`, with the given
+    amount of resources.
+
+    :param int resource_count: The amount of resources to add
+    :rtype: dict[str, Any]
+    :return: The package
+    """
+    package = _sample_package(resource_count)
+    package.update({
+        'id': '00000000-0000-0000-0000-000000000000',
+        'metadata_created': '2020-01-01T00:00:00',
+        'metadata_modified': '2020-01-01T00:00:00',
+        'high_value': 'true',
+        'referentie_data': 'false',
+        'basis_register': 'false'
+    })
+    [resource.update({'size': 1024, 'hash': '0' * 32, 'hash_algorithm': 'md5'})
+     for resource in package['resources']]
+
+    return package
+
+
+def _sample_package(resource_count=2):
+    """
+    Creates a DCAT-AP-DONL package which uses the first entry of each of the
+    vocabularies it references.
+
+    :param int resource_count: The amount of resources to add
+    :rtype: dict[str, Any]
+    :return: The package
+    """
+    def first(name):
+        return sorted(get_list(name, 'vocabulary'))[0]
+
+    language = first('DONL:Language')
+    license_id = first('DONL:License')
+
+    package = {
+        'name': 'donl-benchmark',
+        'title': 'Benchmark',
+        'notes': 'A package used to benchmark ckanext-dataoverheid',
+        'identifier': 'https://data.overheid.nl/dataset/donl-benchmark',
+        'theme': [first('Overheid:Taxonomiebeleidsagenda')],
+        'authority': first('DONL:Organization'),
+        'publisher': first('DONL:Organization'),
+        'contact_point_name': 'Benchmark',
+        'contact_point_email': 'opendata@overheid.nl',
+        'metadata_language': language,
+        'language': [language],
+        'license_id': license_id,
+        'access_rights': first('Overheid:Openbaarheidsniveau'),
+        'frequency': first('Overheid:Frequency'),
+        'issued': '2020-01-01T00:00:00',
+        'modified': '2020-01-01',
+        'temporal_start': '2019-01-01T00:00:00',
+        'temporal_end': '2020-01-01T00:00:00',
+        'resources': [{
+            'url': 'https://data.overheid.nl/{0}.csv'.format(idx),
+            'name': 'Resource {0}'.format(idx),
+            'description': 'A resource used to benchmark',
+            'metadata_language': language,
+            'language': [language],
+            'license_id': license_id,
+            'format': first('MDR:FiletypeNAL'),
+            'media_type': first('IANA:Mediatypes'),
+            'release_date': '2020-01-01T00:00:00'
+        } for idx in xrange(resource_count)]
+    }
+
+    return package
+
+
+suites = {
+    'validation': validation,
+    'spatial': spatial,
+    'communities': communities,
+    'cross_field': cross_field,
+    'indexing': indexing,
+    'show': show,
+    'graphs': graphs
+}
+rdflib_outputs = ['xml', 'n3', 'nt']
+baseline_path = os.path.join(os.path.dirname(__file__), 'resources',
+                             'benchmarks', 'baseline.json')
@@ -0,0 +1,191 @@
+# encoding: utf-8
+
+
+from ckan.lib.cli import CkanCommand
+
+
+class DataOverheidCommand(CkanCommand):
+    """
+    Performs maintenance tasks of the ckanext-dataoverheid extension.
+
+    Usage:
+
+        dataoverheid benchmark [SUITE] [ITERATIONS] [RECORDED]
+            Runs the given benchmark suite, or all suites when no suite or
+            `all` is given. Each benchmark is run 100 times unless specified
+            otherwise. The results are compared against the durations
+            recorded in the given JSON file, or against those recorded for
+            the release before the performance work when no file is given.
+            When the given file does not exist, the results are recorded in
+            it instead.
+
+        dataoverheid reindex [BATCH_SIZE] [PROCESSES]
+            Rebuilds the Solr index of all packages using a pool of processes,
+            posting the packages to Solr in batches of 1000 unless specified
+            otherwise. Uses a process per CPU unless specified otherwise.
+            The documents of purged and deleted packages are removed.
+
+        dataoverheid export FILE [FORMAT] [PROCESSES]
+            Exports the DCAT-AP-DONL description of all public packages to a
+            gzip compressed dump, in the `nt` format unless specified
+            otherwise (`nt`, `turtle`, `xml` or `json-ld`). Uses a process per
+            CPU unless specified otherwise.
+
+        dataoverheid validate FILE [ACTION] [PROCESSES]
+            Validates the packages in the given JSON file, which holds a list
+            of packages, without storing them. Validates for `package_create`
+            unless specified otherwise (`package_create` or
+            `package_update`). Uses a process per CPU unless specified
+            otherwise.
+    """
+    summary = __doc__.split('\n')[1].strip()
+    usage = __doc__
+    min_args = 1
+    max_args = 4
+
+    def command(self):
+        """
+        Executes the requested sub command.
+
+        :rtype: None
+        """
+        self._load_config()
+        sub_commands = {
+            'benchmark': self.benchmark,
+            'reindex': self.reindex,
+            'export': self.export,
+            'validate': self.validate
+        }
+
+        try:
+            sub_command = sub_commands[self.args[0]]
+        except KeyError:
+            print(self.usage)
+            return
+
+        sub_command(*self.args[1:])
+
+    def benchmark(self, suite=None, iterations=100, path=None):
+        """
+        Runs one or all of the benchmark suites and prints the average duration
+        of each benchmark, how often it can run per second and how much faster
+        it is than the recorded duration, if any.
+
+        :param str suite: The name of the suite to run
+        :param int iterations: The amount of times to run each benchmark
+        :param str path: The path of the recorded durations
+        :rtype: None
+        """
+        import os
+        from ckanext.dataoverheid import benchmarks
+
+        suite_names = [suite] if suite and suite != 'all' \
+            else sorted(benchmarks.suites.keys())
+        results = benchmarks.run(suite_names, int(iterations), self.site_user)
+
+        if path and not os.path.exists(path):
+            benchmarks.record(results, int(iterations), path)
+            print('{0} results recorded in {1}'.format(len(results), path))
+            return
+
+        for suite_name, label, duration, recorded in benchmarks.compare(
+                results, benchmarks.load(path)):
+            print('{0:<16}{1:<56}{2:>12.3f} ms{3:>12.1f} /s{4:>10}'.format(
+                suite_name, label, duration * 1000,
+                1 / duration if duration else 0,
+                '{0:.1f}x'.format(recorded / duration)
+                if recorded and duration else ''
+            ))
+
+    def reindex(self, batch_size=1000, processes=None):
+        """
+        Rebuilds the Solr index of all packages and prints the throughput after
+        every batch.
+
+        :param int batch_size: The amount of packages to post to Solr at once
+        :param int processes: The amount of processes creating Solr documents
+        :rtype: None
+        """
+        import multiprocessing
+        from ckanext.dataoverheid import reindex
+
+        def report(indexed, seconds):
+            print('{0:>10} packages indexed{1:>12.1f} packages/s'.format(
+                indexed, indexed / seconds if seconds else 0
+            ))
+
+        indexed, removed, failed, seconds = reindex.run(
+            int(batch_size),
+            int(processes or multiprocessing.cpu_count()),
+            report
+        )
+
+        print('{0} packages indexed, {1} removed from the index, {2} failed, '
+              'in {3:.1f} s'.format(indexed, removed, failed, seconds))
+
+    def export(self, path=None, output='nt', processes=None):
+        """
+        Exports the DCAT-AP-DONL description of all public packages to a dump
+        and prints the throughput after every batch.
+
+        :param str path: The path of the dump
+        :param str output: The output format
+        :param int processes: The amount of processes building Graphs
+        :rtype: None
+        """
+        import multiprocessing
+        from ckanext.dataoverheid import export
+
+        if not path:
+            print(self.usage)
+            return
+
+        def report(exported, seconds):
+            print('{0:>10} packages exported{1:>12.1f} packages/s'.format(
+                exported, exported / seconds if seconds else 0
+            ))
+
+        exported, failed, seconds = export.run(
+            path, output, 1000,
+            int(processes or multiprocessing.cpu_count()),
+            report
+        )
+
+        print('{0} packages exported, {1} failed, in {2:.1f} s'.format(
+            exported, failed, seconds
+        ))
+
+    def validate(self, path=None, action='package_create', processes=None):
+        """
+        Validates the packages of a JSON file and prints the errors of each
+        invalid package.
+
+        :param str path: The path of the JSON file
+        :param str action: The action to validate for
+        :param int processes: The amount of processes validating packages
+        :rtype: None
+        """
+        import json
+        import multiprocessing
+        from ckanext.dataoverheid import validate
+
+        try:
+            processes = int(processes or multiprocessing.cpu_count())
+        except (TypeError, ValueError):
+            processes = None
+
+        if not path or not processes:
+            print(self.usage)
+            return
+
+        results, seconds = validate.run(path, action, processes,
+                                        self.site_user['name'])
+        invalid = [result for result in results if not result['success']]
+
+        for result in invalid:
+            print('{0}: {1}'.format(result['name'],
+                                    json.dumps(result['errors'])))
+
+        print('{0} packages valid, {1} invalid, in {2:.1f} s'.format(
+            len(results) - len(invalid), len(invalid), seconds
+        ))
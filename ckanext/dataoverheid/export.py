@@ -0,0 +1,159 @@
+# encoding: utf-8
+
+
+import gzip
+import logging
+import multiprocessing
+import os
+import timeit
+from itertools import chain
+import ckan.model as model
+import ckan.plugins.toolkit as tk
+from ckanext.dataoverheid.logic.helpers.queries import package_id_batches
+from ckanext.dataoverheid.logic.rdf import writers
+from ckanext.dataoverheid.logic.rdf.graph_builder import \
+    CatalogDCATGraphBuilder, DatasetDCATGraphBuilder
+
+
+logger = logging.getLogger('ckanext-dataoverheid')
+
+
+def run(path, output, batch_size, processes, report):
+    """
+    Exports the full DCAT-AP-DONL description of every active, public package
+    to a gzip compressed dump. The package ids are streamed from the database
+    in batches, while a pool of processes builds the Graph of each package of
+    a batch and serializes it. The serializations of a batch are written while
+    the next batch is being processed.
+
+    The dump is written next to the given path first, and only replaces it
+    once complete.
+
+    :param str path: The path of the dump
+    :param str output: The output format; `'nt'`, `'turtle'`, `'xml'` or
+                       `'json-ld'`
+    :param int batch_size: The amount of packages per batch
+    :param int processes: The amount of processes building Graphs
+    :param function report: Called with the amount of packages exported and
+                            the amount of seconds passed after every batch
+    :rtype: (int, int, float)
+    :return: The amount of packages exported and failed, and the seconds passed
+    """
+    if output not in writers.writers:
+        raise ValueError('unsupported output format {0}'.format(output))
+
+    catalog = CatalogDCATGraphBuilder()
+    chunk_size = max(1, batch_size // (processes * 4))
+    progress = {'exported': 0, 'failed': 0}
+    start = timeit.default_timer()
+    temporary_path = path + '.building'
+
+    # The pool is forked without any database connections to inherit.
+    model.Session.remove()
+    model.meta.engine.dispose()
+    pool = multiprocessing.Pool(processes, _init_process, (output,))
+    dump = gzip.open(temporary_path, 'wb')
+
+    def write(pending):
+        for serialization, exported, failed in pending.get():
+            dump.write(serialization)
+            progress['exported'] += exported
+            progress['failed'] += failed
+
+        report(progress['exported'], timeit.default_timer() - start)
+
+    try:
+        dump.write(writers.header(output, catalog.ns))
+        dump.write(writers.fragment(catalog.graph.triples(), output,
+                                    catalog.ns))
+        pending = None
+
+        for package_ids in package_id_batches(_package_query(), batch_size):
+            chunks = [package_ids[idx:idx + chunk_size]
+                      for idx in xrange(0, len(package_ids), chunk_size)]
+            processing = pool.map_async(_serialize_packages, chunks)
+
+            if pending:
+                write(pending)
+
+            pending = processing
+
+        if pending:
+            write(pending)
+
+        dump.write(writers.footer(output))
+    finally:
+        pool.close()
+        pool.join()
+        dump.close()
+
+    os.rename(temporary_path, path)
+
+    return progress['exported'], progress['failed'], \
+        timeit.default_timer() - start
+
+
+def _package_query():
+    """
+    Creates the query for the ids of all active, public packages.
+
+    :rtype: Query
+    :return: The query
+    """
+    return model.Session.query(model.Package.id)\
+        .filter(model.Package.state == model.State.ACTIVE)\
+        .filter(model.Package.private == False)  # noqa
+
+
+def _init_process(output):
+    """
+    Prepares a forked process for serializing packages in the given output
+    format.
+
+    :param str output: The output format
+    :rtype: None
+    """
+    _export['output'] = output
+    _export['catalog'] = CatalogDCATGraphBuilder()
+
+
+def _serialize_packages(package_ids):
+    """
+    Builds the Graphs of the given packages and serializes them, including the
+    triples which add each package to the Catalog node.
+
+    :param list of str package_ids: The ids of the packages
+    :rtype: (str, int, int)
+    :return: The serialization and the amount of packages that were and that
+             could not be serialized
+    """
+    context = {
+        'model': model,
+        'ignore_auth': True,
+        'use_cache': False
+    }
+    package_show = tk.get_action('package_show')
+    catalog = _export['catalog']
+    serializations = []
+    failed = 0
+
+    for package_id in package_ids:
+        try:
+            package = package_show(dict(context), {'id': package_id})
+            builder = DatasetDCATGraphBuilder(package['name'])
+            builder.parse_ckan_package(package)
+            serializations.append(writers.fragment(
+                chain(builder.graph.triples(),
+                      catalog.package_triples(package['name'])),
+                _export['output'], builder.ns
+            ))
+        except Exception as e:
+            logger.warning('unable to export package %s: %s', package_id, e)
+            failed += 1
+
+    model.Session.remove()
+
+    return ''.join(serializations), len(serializations), failed
+
+
+_export = {'output': None, 'catalog': None}
@@ -2,64 +2,272 @@
 
 
 from ckanext.dataoverheid.logic.rdf.graph_builder import \
-    DatasetDCATGraphBuilder, CatalogDCATGraphBuilder
+    DatasetDCATGraphBuilder
+from ckanext.dataoverheid.logic.rdf import cache as rdf_cache, \
+    catalog as rdf_catalog, writers
+from ckanext.dataoverheid.logic.helpers import profiler
+from ckanext.dataoverheid.logic.helpers.config import get_config, \
+    redis_connection, redis_key
+import ckan.lib.plugins as lib_plugins
+import ckan.model as model
 import ckan.plugins.toolkit as tk
-from ckan.lib.redis import connect_to_redis
-from datetime import datetime
 
 
 @tk.side_effect_free
 def package_as_rdf(context, data_dict=None):
     """
-    Generates a RDF graph from a given CKAN package.
+    Generates a RDF graph from a given CKAN package. The serialized Graph of a
+    public package is cached per process until the package is modified, see
+    `ckanext.dataoverheid.logic.rdf.cache`.
+
+    Will raise a ValidationError when the output format is not supported by
+    `ckanext.dataoverheid.logic.rdf.writers`.
 
     :param dict[Any, Any] context: The current CKAN context
     :param dict[str, Any] data_dict: The package to model
     :rtype: str
     :return: The Graph, in the requested output format
     """
+    output = data_dict.get('output', 'xml')
+
+    if output not in writers.writers:
+        raise tk.ValidationError({'output': ['expected one of {0}'.format(
+            ', '.join(sorted(writers.writers.keys()))
+        )]})
+
+    serialization = rdf_cache.get_package(data_dict.get('id'), output)
+
+    if serialization is not None:
+        return serialization
+
     package = tk.get_action('package_show')(context, data_dict)
 
     graph = DatasetDCATGraphBuilder(package['name'])
     graph.parse_ckan_package(package)
+    serialization = graph.as_(output)
+    rdf_cache.put_package(package, output, serialization)
 
-    return graph.as_(data_dict.get('output', 'xml'))
+    return serialization
 
 
 @tk.side_effect_free
 def catalog_as_rdf(context, data_dict=None):
     """
-    Generates a RDF graph from the CKAN catalog. The output of the Graph is
-    cached in Redis for up to 24 hours. This cache will be used on any
-    subsequent request for the Graph.
+    Generates a RDF graph from the CKAN catalog. The catalog is maintained
+    incrementally in Redis as packages are created, updated and deleted, see
+    `ckanext.dataoverheid.logic.rdf.catalog`.
+
+    Output keys sharing a rdflib format (e.g. `'ttl'` and `'n3'`) share its
+    cached Graph. An out of date Graph is returned while it is refreshed in
+    the background.
+
+    When `'page'` is 1 or `'after'` is given, only that page of the catalog is
+    generated, with Hydra links to the other pages, see
+    `ckanext.dataoverheid.logic.rdf.catalog.read_page()`.
+
+    When the `'stream'` flag of the context is set, the Graph is returned in
+    chunks as it is generated, which keeps the memory used independent of the
+    size of the catalog. Only the controller sets this flag, since the API can
+    not return a generator.
+
+    :param dict[Any, Any] context: The current CKAN context
+    :param dict[Any, Any] data_dict: The output format under `'output'`, and
+                                     optionally `'page'` or `'after'`
+    :rtype: str|generator of str
+    :return: The Graph, in the requested output format
+    """
+    output_key = data_dict.get('output', 'xml')
+    output = catalog_format(output_key)
+    page = data_dict.get('page')
+    after = data_dict.get('after')
+    stream = context.get('stream')
+
+    if page not in [None, '', '1', 1]:
+        raise tk.ValidationError({'page': [
+            'expected 1, the other pages are linked to with after'
+        ]})
+
+    if page or after:
+        serialization = rdf_catalog.read_page(output, after, '{0}/catalog.{1}'
+                                              .format(catalog_url(),
+                                                      output_key))
+    elif stream:
+        serialization, status = rdf_catalog.stream(output)
+        redis_connection().hincrby(catalog_stats_key, output + '.' + status,
+                                   1)
+    else:
+        serialization, status = rdf_catalog.read(output)
+        redis_connection().hincrby(catalog_stats_key, output + '.' + status,
+                                   1)
+
+        return serialization
+
+    return serialization if stream else ''.join(serialization)
+
+
+@tk.side_effect_free
+def catalog_cache_statistics(context, data_dict=None):
+    """
+    Shows the amount of hits, stale hits and misses of the catalog cache of
+    each rdflib format.
 
     :param dict[Any, Any] context: The current CKAN context
     :param dict[Any, Any] data_dict: Injected by CKAN, not used
+    :rtype: dict[str, dict[str, int]]
+    :return: The hits, stale hits and misses keyed by rdflib format
+    """
+    tk.check_access('rdf_catalog_cache_statistics', context, data_dict)
+
+    statistics = {}
+
+    for field, count in redis_connection().hgetall(catalog_stats_key)\
+            .iteritems():
+        output, counter = field.rsplit('.', 1)
+        statistics.setdefault(output, {'hit': 0, 'stale': 0, 'miss': 0})[
+            counter] = int(count)
+
+    return statistics
+
+
+def catalog_format(output):
+    """
+    Resolves an output key of the catalog, such as `'ttl'`, to the rdflib
+    format it is generated in.
+
+    Will raise a ValidationError when the output key is not one of the outputs
+    of the `'dcat'` config.
+
+    :param str output: The output key
     :rtype: str
-    :return: The Graph, in the requested output format
+    :return: The rdflib format
+    """
+    outputs = get_config('dcat')['outputs']
+
+    if output not in outputs:
+        raise tk.ValidationError({'output': ['expected one of {0}'.format(
+            ', '.join(sorted(outputs.keys()))
+        )]})
+
+    return outputs[output]['output_name']
+
+
+def catalog_url():
+    """
+    Determines the base URL of the catalog pages, from the `ckan.site_url` of
+    this CKAN installation.
+
+    :rtype: str
+    :return: The URL, without a trailing slash
     """
-    current_date = str(datetime.strftime(datetime.now(), '%Y%m%d'))
-    redis_key = 'ckanext.dataoverheid:rdf.'
-    cache_key = redis_key + '_cache_date'
-    dates_match = current_date == redis_conn.get(cache_key)
+    return tk.config.get('ckan.site_url', '').rstrip('/')
+
+
+def package_validate_many(context, data_dict=None):
+    """
+    Validates a batch of packages against the package schema without storing
+    them, allowing harvesters to screen an entire harvest before writing it.
+
+    All packages are validated against the same cached schema, so the resolved
+    config, vocabularies and compiled patterns are shared by the whole batch.
+    Dates parsed by the validators are only cached per package. The packages
+    are validated one after the other within the request; larger batches can
+    be validated by a pool of processes through `paster dataoverheid
+    validate`.
+
+    :param dict[Any, Any] context: The current CKAN context
+    :param dict[str, Any] data_dict: The packages to validate under the key
+                                     `'packages'` and the action to validate
+                                     for under `'action'` (either
+                                     `'package_create'`, the default, or
+                                     `'package_update'`)
+    :rtype: list of dict[str, Any]
+    :return: The name, success and errors of each package, in the given order
+    """
+    tk.check_access('package_validate_many', context, data_dict)
+
+    packages = data_dict.get('packages')
+    action = data_dict.get('action', 'package_create')
+
+    if not isinstance(packages, list):
+        raise tk.ValidationError({'packages': ['expected a list of packages']})
+
+    if action not in ['package_create', 'package_update']:
+        raise tk.ValidationError({'action': ['expected package_create or '
+                                             'package_update']})
+
+    batch_context = validation_context(context.get('user'))
+    results = [validate_package(batch_context, action, package)
+               for package in packages]
+    profiler.log_summary('package_validate_many')
+
+    return results
 
-    if redis_conn.exists(cache_key) and dates_match:
-        return redis_conn.get('ckanext.dataoverheid:rdf.catalog_' +
-                              data_dict.get('output'))
 
-    packages = tk.get_action('package_list')(context, {})
+@tk.side_effect_free
+def validation_profile_show(context, data_dict=None):
+    """
+    Shows the statistics of the validators and converters of the package
+    schemas as recorded by the current process. Statistics are only recorded
+    when `ckan.ckanext-dataoverheid.profile_validation` is enabled.
+
+    :param dict[Any, Any] context: The current CKAN context
+    :param dict[str, Any] data_dict: Not used
+    :rtype: dict[str, Any]
+    :return: Whether profiling is enabled and the statistics per field and
+             validator, slowest first
+    """
+    tk.check_access('validation_profile_show', context, data_dict)
+
+    return {
+        'enabled': profiler.enabled(),
+        'validators': profiler.statistics()
+    }
+
+
+def validation_context(user):
+    """
+    Creates the context used to validate a batch of packages.
+
+    :param str user: The name of the CKAN user validating the packages
+    :rtype: dict[str, Any]
+    :return: The validation context
+    """
+    return {
+        'model': model,
+        'session': model.Session,
+        'user': user
+    }
+
+
+def validate_package(batch_context, action, package):
+    """
+    Validates a single package of a batch.
+
+    :param dict[str, Any] batch_context: The context shared by the batch
+    :param str action: The action to validate for
+    :param dict[str, Any] package: The package to validate
+    :rtype: dict[str, Any]
+    :return: The name, success and errors of the package
+    """
+    package_plugin = lib_plugins.lookup_package_plugin(package.get('type'))
+    package_context = dict(batch_context)
 
-    graph = CatalogDCATGraphBuilder()
-    graph.add_ckan_packages(packages)
+    if action == 'package_update':
+        schema = package_plugin.update_package_schema()
+        package_context['package'] = model.Package.get(
+            package.get('id') or package.get('name')
+        )
+    else:
+        schema = package_plugin.create_package_schema()
 
-    redis_conn.set(redis_key + '_cache_date', current_date)
-    redis_conn.set(redis_key + 'catalog_xml', graph.as_('xml'))
-    redis_conn.set(redis_key + 'catalog_rdf', graph.as_('xml'))
-    redis_conn.set(redis_key + 'catalog_ttl', graph.as_('n3'))
-    redis_conn.set(redis_key + 'catalog_n3', graph.as_('n3'))
+    data, errors = lib_plugins.plugin_validate(package_plugin, package_context,
+                                               package, schema, action)
 
-    return redis_conn.get(redis_key + 'catalog_' +
-                          data_dict.get('output', 'xml'))
+    return {
+        'name': package.get('name'),
+        'success': not errors,
+        'errors': errors
+    }
 
 
-redis_conn = connect_to_redis()
+catalog_stats_key = redis_key + 'rdf.catalog_statistics'
@@ -41,3 +41,55 @@ def dataset_purge_authorization(context, package=None):
             'success': False,
             'msg': 'No package exists with the given id'
         }
+
+
+def package_validate_many_authorization(context, data_dict=None):
+    """
+    Authorizes any logged in CKAN user to perform `'package_validate_many'`
+    actions. The permissions of the user on the organizations of the packages
+    are checked during validation.
+
+    :param dict[str, Any] context: The current CKAN context
+    :param dict[str, Any] data_dict: The packages to validate
+    :rtype dict[str, Any]:
+    """
+    if context.get('user'):
+        return {
+            'success': True
+        }
+
+    return {
+        'success': False,
+        'msg': 'You must be logged in to perform this action'
+    }
+
+
+def validation_profile_show_authorization(context, data_dict=None):
+    """
+    Only sysadmins, who bypass this authorization, are allowed to perform
+    `'validation_profile_show'` actions.
+
+    :param dict[str, Any] context: The current CKAN context
+    :param dict[str, Any] data_dict: Not used
+    :rtype dict[str, Any]:
+    """
+    return {
+        'success': False,
+        'msg': 'Only sysadmins are allowed to view the validation profile'
+    }
+
+
+def catalog_cache_statistics_authorization(context, data_dict=None):
+    """
+    Only sysadmins, who bypass this authorization, are allowed to perform
+    `'rdf_catalog_cache_statistics'` actions.
+
+    :param dict[str, Any] context: The current CKAN context
+    :param dict[str, Any] data_dict: Not used
+    :rtype dict[str, Any]:
+    """
+    return {
+        'success': False,
+        'msg': 'Only sysadmins are allowed to view the catalog cache '
+               'statistics'
+    }
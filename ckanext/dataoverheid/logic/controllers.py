@@ -20,21 +20,32 @@ class RDFController(BaseController):
 
     def catalog_as_rdf(self, output):
         """
-        Creates a RDF graph from the CKAN catalog.
+        Creates a RDF graph from the CKAN catalog, or from a single page of it
+        when the `page` or `after` parameter is given. The Graph is streamed to
+        the client as it is generated.
 
         :param str output: The output format to use
         :rtype: Any
         :return: The created Graph
         """
-        output_contents = self.outputs.get(output, 'xml')
+        output_contents = self.outputs.get(output, self.outputs['xml'])
 
         tk.response.headers.update(
             {'Content-type': bytes(output_contents['content-type'])}
         )
 
-        return tk.get_action('rdf_catalog_show')({}, {
-            'output': output_contents['output_name']
-        })
+        try:
+            return tk.get_action('rdf_catalog_show')({'stream': True}, {
+                'output': output,
+                'page': tk.request.params.get('page'),
+                'after': tk.request.params.get('after')
+            })
+        except tk.ValidationError as e:
+            tk.abort(400, ', '.join(error for errors
+                                    in e.error_dict.itervalues()
+                                    for error in errors))
+        except tk.ObjectNotFound as e:
+            tk.abort(404, unicode(e))
 
     def package_as_rdf(self, package_id, output):
         """
@@ -45,13 +56,18 @@ class RDFController(BaseController):
         :rtype: Any
         :return: The created Graph
         """
-        output_contents = self.outputs.get(output, 'xml')
+        output_contents = self.outputs.get(output, self.outputs['xml'])
 
         tk.response.headers.update(
             {'Content-type': bytes(output_contents['content-type'])}
         )
 
-        return tk.get_action('rdf_package_show')({}, {
-            'id': package_id,
-            'output': output_contents['output_name']
-        })
+        try:
+            return tk.get_action('rdf_package_show')({}, {
+                'id': package_id,
+                'output': output_contents['output_name']
+            })
+        except tk.ValidationError as e:
+            tk.abort(400, ', '.join(e.error_dict.get('output', [])))
+        except tk.ObjectNotFound as e:
+            tk.abort(404, unicode(e))
@@ -3,30 +3,121 @@
 
 import os
 import json
+import functools
+import logging
+import time
 from datetime import datetime
-from ckan.lib.redis import connect_to_redis
+from ckan.common import config as ckan_config
+from ckan.lib.redis import REDIS_URL_SETTING_NAME, REDIS_URL_DEFAULT_VALUE
+from redis import ConnectionPool, Redis
+
+
+logger = logging.getLogger('ckanext-dataoverheid')
 
 
 def get_config(config_name):
     """
     Retrieves a specific section of the config by its name. The config is
-    retrieved from Redis, as it is cached there for up to 24 hours.
+    retrieved from the in-memory snapshot of this worker process, see also
+    `get_version()`.
+
+    The returned section is shared between all callers and must be treated as
+    read-only.
 
     :param str config_name: the name of the config key
     :rtype: dict[str, list of str|dict[str, list of str|dict[str, dict]]
     """
-    _load_config_file()
+    return _current_snapshot()['config'][config_name]
+
+
+def get_version():
+    """
+    Retrieves the version stamp of the config snapshot currently in use by this
+    worker process. Any value derived from the config can safely be cached for
+    as long as the version stamp remains the same.
+
+    :rtype: str
+    :return: The version stamp of the config snapshot
+    """
+    return _current_snapshot()['version']
+
+
+def per_version(func):
+    """
+    Decorates a function so that its results are cached per set of arguments
+    for as long as the version stamp of the config snapshot remains the same.
+    Intended for functions which derive data from the config, such as compiled
+    patterns, lookup sets or schemas. The arguments of the decorated function
+    must be hashable.
+
+    :param function func: The function to decorate
+    :rtype: function
+    """
+    cache = {'version': None, 'results': {}}
+
+    @functools.wraps(func)
+    def per_version_wrapper(*args):
+        """
+        Returns the cached result for the given arguments, calling the
+        decorated function when no result is cached for the current version.
+
+        :rtype: Any
+        """
+        version = get_version()
 
-    return json.loads(redis_conn.get(config_key + config_name))
+        if cache['version'] != version:
+            cache['version'] = version
+            cache['results'] = {}
+
+        try:
+            return cache['results'][args]
+        except KeyError:
+            cache['results'][args] = func(*args)
+
+            return cache['results'][args]
+
+    return per_version_wrapper
+
+
+def redis_connection():
+    """
+    Returns the Redis connection of the current process. The connection and its
+    connection pool are created on first use rather than on import, and are
+    created anew whenever the process id changes. This ensures that processes
+    forked by uWSGI or gunicorn never share sockets with their parent. All the
+    modules of this extension share the same connection pool.
+
+    :rtype: redis.Redis
+    :return: The Redis connection
+    """
+    if _redis['pid'] != os.getpid():
+        url = ckan_config.get(REDIS_URL_SETTING_NAME, REDIS_URL_DEFAULT_VALUE)
+
+        _redis['connection'] = _CountingRedis(
+            connection_pool=ConnectionPool.from_url(url)
+        )
+        _redis['pid'] = os.getpid()
+        _redis['calls'] = 0
+
+    return _redis['connection']
+
+
+def redis_call_count():
+    """
+    Returns the amount of Redis commands issued by this extension in the
+    current process.
+
+    :rtype: int
+    :return: The amount of Redis commands
+    """
+    return _redis['calls'] if _redis['pid'] == os.getpid() else 0
 
 
 def in_list(name, list_type, value):
     """
     Checks whether or not a given value is part of a given list.
 
-    The lists to check against are stored in the Redis instance configured in
-    the CKAN `production.ini` file. So in order to check against the list, the
-    list will first be retrieved from Redis.
+    See also: `get_list()`.
 
     :param str name: The name of the list
     :param str list_type: The type of the list
@@ -34,11 +125,40 @@ def in_list(name, list_type, value):
     :rtype: bool
     :return: Whether or not the value is contained in the list
     """
-    _load_config_file()
+    return value in get_list(name, list_type)
+
 
-    return value in json.loads(
-        redis_conn.get(redis_key + list_type + '.' + name)
-    )
+@per_version
+def get_list(name, list_type):
+    """
+    Retrieves all the entries of a given list as a frozenset.
+
+    The lists are indexed per worker process; each list is loaded once from the
+    local filesystem and kept in memory until the version stamp of the Redis
+    cache changes. Should the list not be available locally, the list will be
+    retrieved from the Redis instance configured in the CKAN `production.ini`
+    file instead.
+
+    :param str name: The name of the list
+    :param str list_type: The type of the list
+    :rtype: frozenset of str
+    :return: The entries of the list
+    """
+    try:
+        types_map = {
+            'vocabulary': 'vocabularies',
+            'taxonomy': 'taxonomies'
+        }
+        lists = get_config('validation')[types_map[list_type]]
+        entries = _load_list(name, lists[name]['local'], list_type)
+    except Exception as e:
+        logger.warning('%s %s not available locally, using Redis; %s',
+                       list_type, name, e)
+        entries = json.loads(
+            redis_connection().get(redis_key + list_type + '.' + name)
+        )
+
+    return frozenset(entries)
 
 
 def _load_list(name, local_name, list_type='vocabulary'):
@@ -89,6 +209,67 @@ def _load_list(name, local_name, list_type='vocabulary'):
                         'or is not supported')
 
 
+class _CountingRedis(Redis):
+    """
+    Redis client which keeps track of the amount of commands it has issued.
+    """
+    def execute_command(self, *args, **options):
+        """
+        Executes a Redis command and increments the command counter of the
+        current process.
+
+        :rtype: Any
+        """
+        _redis['calls'] += 1
+
+        return Redis.execute_command(self, *args, **options)
+
+
+def _current_snapshot():
+    """
+    Returns the config snapshot of this worker process. The snapshot holds the
+    config sections stored in Redis as plain dicts and lists which are shared by
+    every caller and must therefore never be modified; the snapshot is replaced
+    as a whole whenever the version stamp in Redis changes.
+
+    The version stamp is checked at most once every
+    `ckan.ckanext-dataoverheid.config_check_interval` seconds (defaults to 60),
+    the config sections themselves are only retrieved from Redis when the
+    version stamp differs from the one of the current snapshot.
+
+    :rtype: dict[str, Any]
+    :return: The config snapshot
+    """
+    snapshot = _snapshot['current']
+    now = time.time()
+    check_interval = float(ckan_config.get(
+        'ckan.ckanext-dataoverheid.config_check_interval', 60))
+
+    if snapshot and now - _snapshot['checked_at'] < check_interval:
+        return snapshot
+
+    calls = redis_call_count()
+    version = _load_config_file()
+    _snapshot['checked_at'] = now
+
+    if snapshot and snapshot['version'] == version:
+        return snapshot
+
+    sections = redis_connection().mget([config_key + section
+                                        for section in config_sections])
+    snapshot = {
+        'version': version,
+        'config': {section: json.loads(contents) for section, contents
+                   in zip(config_sections, sections)}
+    }
+    _snapshot['current'] = snapshot
+    logger.info('config snapshot %s loaded in %.1fms using %d Redis calls',
+                version, (time.time() - now) * 1000,
+                redis_call_count() - calls)
+
+    return snapshot
+
+
 def _load_config_file():
     """
     Loads the contents from the ckanext-dataoverheid configuration file and
@@ -97,29 +278,26 @@ def _load_config_file():
     available to CKAN during the package validation process.
 
     The Redis cache will be updated once every 24 hours on the first request of
-    the day.
+    the day. The date of the last update doubles as the version stamp of the
+    cache.
 
-    :rtype: None
+    :rtype: str
+    :return: The version stamp of the Redis cache
     """
     current_date = str(datetime.strftime(datetime.now(), '%Y%m%d'))
     cache_key = redis_key + '_cache_date'
+    redis_conn = redis_connection()
 
     if current_date == redis_conn.get(cache_key):
-        return
+        return current_date
 
     filepath = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..',
                             'config.json')
 
     with open(filepath, 'r') as config_file:
-        config_keys = [
-            'validation', 'transformations', 'dcat', 'solr',
-            'properties_to_remove'
-        ]
         contents = json.load(config_file)
 
-        redis_conn.set(cache_key, current_date)
-
-        for redis_config_key in config_keys:
+        for redis_config_key in config_sections:
             redis_conn.set(config_key + redis_config_key,
                            json.dumps(contents.get(redis_config_key)))
 
@@ -131,8 +309,15 @@ def _load_config_file():
                         json.dumps(_load_list(key, tax['local'], 'taxonomy')))
          for key, tax in contents.get('validation')['taxonomies'].iteritems()]
 
+        redis_conn.set(cache_key, current_date)
+
+    return current_date
+
 
 redis_key = 'ckanext.dataoverheid:'
 config_key = redis_key + 'config.'
-redis_conn = connect_to_redis()
-_load_config_file()
+config_sections = [
+    'validation', 'transformations', 'dcat', 'solr', 'properties_to_remove'
+]
+_snapshot = {'current': None, 'checked_at': 0}
+_redis = {'pid': None, 'connection': None, 'calls': 0}
@@ -0,0 +1,169 @@
+# encoding: utf-8
+
+
+import inspect
+import logging
+import timeit
+from ckan.common import config as ckan_config
+from ckan.plugins.toolkit import asbool
+from ckanext.dataoverheid.logic.helpers.config import redis_call_count
+
+
+logger = logging.getLogger('ckanext-dataoverheid')
+
+
+def enabled():
+    """
+    Determines whether the validators and converters of the package schemas
+    should be profiled.
+
+    :rtype: bool
+    :return: Whether profiling is enabled
+    """
+    return asbool(ckan_config.get(
+        'ckan.ckanext-dataoverheid.profile_validation', False
+    ))
+
+
+def instrument(schema, field=None):
+    """
+    Wraps every validator and converter of this extension in a given schema so
+    that its calls, cumulative duration and Redis calls are recorded per
+    package field. Validators and converters of CKAN itself are left as is.
+
+    :param dict[str, Any] schema: The schema to instrument
+    :param str field: The name of the field which the schema belongs to
+    :rtype: dict[str, Any]
+    :return: The instrumented schema
+    """
+    for key, value in schema.iteritems():
+        name = key if field is None else '{0}.{1}'.format(field, key)
+
+        if isinstance(value, dict):
+            instrument(value, name)
+        elif isinstance(value, list):
+            schema[key] = [_profiled(name, func) for func in value]
+
+    return schema
+
+
+def statistics():
+    """
+    Summarizes everything recorded by this process since it started.
+
+    :rtype: list of dict[str, Any]
+    :return: The statistics per field and validator, slowest first
+    """
+    return _summarize(_profile['totals'])
+
+
+def log_summary(title):
+    """
+    Logs everything recorded by this process since the previous summary, for
+    instance at the end of a request or batch.
+
+    :param str title: The name of the request or batch
+    :rtype: None
+    """
+    summary = _summarize(_profile['pending'])
+    _profile['pending'] = {}
+
+    if not summary:
+        return
+
+    logger.info('validation profile of %s:\n%s', title, '\n'.join([
+        '{0:<40}{1:<32}{2:>8} calls{3:>12.3f} ms{4:>8} redis'.format(
+            entry['field'], entry['validator'], entry['calls'],
+            entry['seconds'] * 1000, entry['redis_calls']
+        ) for entry in summary
+    ]))
+
+
+def _profiled(field, func):
+    """
+    Wraps a single validator or converter. The wrapper accepts the same amount
+    of arguments as the original, since CKAN determines how to call the
+    function by trying its arguments.
+
+    :param str field: The name of the field being validated
+    :param function func: The validator or converter
+    :rtype: function
+    :return: The wrapped validator or converter
+    """
+    if getattr(func, '__module__', None) not in profiled_modules:
+        return func
+
+    try:
+        arity = len(inspect.getargspec(func).args)
+    except TypeError:
+        return func
+
+    label = (field, func.__name__)
+
+    def profiled_validator(key, data, errors, context):
+        return _call(label, func, (key, data, errors, context))
+
+    def profiled_context_converter(value, context):
+        return _call(label, func, (value, context))
+
+    def profiled_converter(value):
+        return _call(label, func, (value,))
+
+    wrappers = {
+        4: profiled_validator,
+        2: profiled_context_converter,
+        1: profiled_converter
+    }
+
+    return wrappers.get(arity, func)
+
+
+def _call(label, func, args):
+    """
+    Calls a validator or converter and records its duration and Redis calls.
+
+    :param (str, str) label: The field and the name of the validator
+    :param function func: The validator or converter
+    :param tuple args: The arguments to call it with
+    :rtype: Any
+    :return: The result of the validator or converter
+    """
+    redis_calls = redis_call_count()
+    start = timeit.default_timer()
+
+    try:
+        return func(*args)
+    finally:
+        duration = timeit.default_timer() - start
+        redis_calls = redis_call_count() - redis_calls
+
+        for recorded in [_profile['totals'], _profile['pending']]:
+            entry = recorded.setdefault(label, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] += redis_calls
+
+
+def _summarize(recorded):
+    """
+    Converts the recorded statistics into a list of dictionaries.
+
+    :param dict[(str, str), list] recorded: The recorded statistics
+    :rtype: list of dict[str, Any]
+    :return: The statistics per field and validator, slowest first
+    """
+    return sorted([{
+        'field': field,
+        'validator': validator,
+        'calls': calls,
+        'seconds': seconds,
+        'redis_calls': redis_calls
+    } for (field, validator), (calls, seconds, redis_calls)
+        in recorded.iteritems()], key=lambda entry: -entry['seconds'])
+
+
+profiled_modules = [
+    'ckanext.dataoverheid.logic.validators',
+    'ckanext.dataoverheid.logic.converters'
+]
+_profile = {'totals': {}, 'pending': {}}
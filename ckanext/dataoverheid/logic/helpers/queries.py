@@ -1,6 +1,7 @@
 # encoding: utf-8
 
 
+import ckan.model as model
 import ckan.plugins.toolkit as tk
 
 
@@ -25,3 +26,34 @@ def wildcard_search(rows=0):
         'facet.mincount': 1,
         'facet.limit': -1
     })
+
+
+def package_id_batches(query, batch_size):
+    """
+    Streams the ids of the packages matched by the given query in batches,
+    ordered by id. Each batch continues after the last id of the previous
+    batch, so that every batch is read from the index on the package ids
+    regardless of its position. The database session is removed after every
+    batch, so no connection is held while a batch is being processed.
+
+    :param Query query: The query for the ids of the packages, e.g.
+                        `model.Session.query(model.Package.id)` with filters
+    :param int batch_size: The amount of ids per batch
+    :rtype: generator of list of str
+    :return: The batches of package ids
+    """
+    last_id = ''
+
+    while True:
+        package_ids = [row[0] for row in query
+                       .filter(model.Package.id > last_id)
+                       .order_by(model.Package.id)
+                       .limit(batch_size)]
+        model.Session.remove()
+
+        if not package_ids:
+            return
+
+        last_id = package_ids[-1]
+
+        yield package_ids
@@ -1,7 +1,7 @@
 # encoding: utf-8
 
 
-from config import get_config
+from config import get_config, per_version
 
 
 def transform_multivalued_properties(data_dict):
@@ -10,41 +10,18 @@ def transform_multivalued_properties(data_dict):
     - all multivalued properties are converted from strings to lists
     - all datetime properties are transformed to the Solr datetime format
 
+    The transformations are performed according to the plan compiled for the
+    current config version, visiting the package and each of its resources
+    once.
+
     :param dict[Any, Any] data_dict: The original dictionary
     :rtype: dict[Any, Any]
     """
-    transformations = get_config('transformations')
-    replacements = (('{', ''), ('}', ''))
-
-    for prop in transformations['package']['multi_valued']:
-        try:
-            for item in replacements:
-                data_dict[prop] = data_dict[prop].replace(*item)
-
-            data_dict[prop] = data_dict[prop].split(',')
-        except KeyError:
-            continue
-
-    for prop in transformations['package']['date']:
-        try:
-            data_dict[prop] = '{0}Z'.format(data_dict[prop])
-        except KeyError:
-            continue
-
-    for prop in transformations['resource']['multi_valued']:
-        try:
-            for resource in data_dict['resources']:
-                for item in replacements:
-                    resource[prop] = resource[prop].replace(*item)
-        except KeyError:
-            continue
-
-    for prop in transformations['resource']['date']:
-        try:
-            for resource in data_dict['resources']:
-                resource[prop] = '{0}Z'.format(resource[prop])
-        except KeyError:
-            continue
+    plan = _transformation_plan()
+
+    _transform(data_dict, plan['package'])
+    [_transform(resource, plan['resource'])
+     for resource in data_dict.get('resources', [])]
 
     return data_dict
 
@@ -59,33 +36,111 @@ def remove_properties(data_dict):
     used by the CKAN core which provide no value to the CKAN installation
     running the `ckanext-dataoverheid` extension.
 
+    The keys are removed in place according to the removal plan of the current
+    config version, which skips the parts of the package for which no keys are
+    to be removed.
+
     :param dict[Any, Any] data_dict: The dictionary representing a CKAN package
     :rtype: None
     """
+    plan = _removal_plan()
+
+    _remove(data_dict, plan['package'])
+
+    if plan['organization'] and data_dict.get('organization'):
+        _remove(data_dict['organization'], plan['organization'])
+
+    for group, properties in plan['lists']:
+        for item in data_dict.get(group) or []:
+            _remove(item, properties)
+
+
+@per_version
+def _transformation_plan():
+    """
+    Compiles the transformations of the config into a plan, once per config
+    version. For both packages and resources the plan holds the multivalued
+    properties, the datetime properties and whether the multivalued properties
+    should be split into lists. Multivalued resource properties are only
+    stripped of their surrounding braces.
+
+    :rtype: dict[str, dict[str, Any]]
+    :return: The transformation plan
+    """
+    transformations = get_config('transformations')
+
+    return {
+        'package': {
+            'multi_valued': tuple(transformations['package']['multi_valued']),
+            'date': tuple(transformations['package']['date']),
+            'split': True
+        },
+        'resource': {
+            'multi_valued': tuple(transformations['resource']['multi_valued']),
+            'date': tuple(transformations['resource']['date']),
+            'split': False
+        }
+    }
+
+
+def _transform(data_dict, plan):
+    """
+    Transforms the properties of a given package or resource in place, in a
+    single visit. Lists stored as strings, e.g. `'{a,b}'`, are stripped of all
+    their braces and optionally split, datetimes are suffixed with the `'Z'` of
+    the Solr datetime format.
+
+    :param dict[str, Any] data_dict: The package or resource to transform
+    :param dict[str, Any] plan: The transformations of the package or resource
+    :rtype: None
+    """
+    for prop in plan['multi_valued']:
+        value = data_dict.get(prop)
+
+        if isinstance(value, basestring):
+            value = value.replace('{', '').replace('}', '')
+            data_dict[prop] = value.split(',') if plan['split'] else value
+
+    for prop in plan['date']:
+        value = data_dict.get(prop)
+
+        if isinstance(value, basestring):
+            data_dict[prop] = value + 'Z'
+        elif value is not None:
+            data_dict[prop] = '{0}Z'.format(value)
+
+
+@per_version
+def _removal_plan():
+    """
+    Resolves the properties to remove of the config into a plan, once per
+    config version. The plan holds the properties to remove from the package
+    and its organization, and the properties to remove from each item of its
+    resources, tags and groups. Lists without any properties to remove are
+    left out of the plan.
+
+    :rtype: dict[str, Any]
+    :return: The removal plan
+    """
     properties_to_remove = get_config('properties_to_remove')
-    [data_dict.pop(prop, None) for prop in properties_to_remove['package']]
-
-    try:
-        [[resource.pop(prop, None) for prop in properties_to_remove['resource']]
-         for resource in data_dict['resources']]
-    except KeyError:
-        pass
-
-    try:
-        [[tag.pop(prop, None) for prop in properties_to_remove['tag']]
-         for tag in data_dict['tags']]
-    except KeyError:
-        pass
-
-    try:
-        [data_dict['organization'].pop(prop, None)
-         for prop in properties_to_remove['organization']
-         if prop in data_dict['organization']]
-    except KeyError:
-        pass
-
-    try:
-        [[group.pop(prop, None) for prop in properties_to_remove['group']]
-         for group in data_dict['groups']]
-    except KeyError:
-        pass
+    lists = [('resources', 'resource'), ('tags', 'tag'), ('groups', 'group')]
+
+    return {
+        'package': tuple(properties_to_remove['package']),
+        'organization': tuple(properties_to_remove['organization']),
+        'lists': tuple((group, tuple(properties_to_remove[item_type]))
+                       for group, item_type in lists
+                       if properties_to_remove[item_type])
+    }
+
+
+def _remove(data_dict, properties):
+    """
+    Removes the given properties from a dictionary in place.
+
+    :param dict[str, Any] data_dict: The dictionary to remove properties from
+    :param tuple of str properties: The properties to remove
+    :rtype: None
+    """
+    for prop in properties:
+        data_dict.pop(prop, None)
@@ -0,0 +1,191 @@
+# encoding: utf-8
+
+
+import logging
+from collections import OrderedDict
+import ckan.model as model
+from ckan.common import config as ckan_config
+from ckanext.dataoverheid.logic.helpers.config import get_version, \
+    redis_connection, redis_key
+from sqlalchemy import event
+
+
+logger = logging.getLogger('ckanext-dataoverheid')
+
+
+def get_package(package_id, output):
+    """
+    Retrieves the cached serialization of a package. The current
+    `metadata_modified` and name of each package are kept in Redis, where they
+    are replaced whenever the package is modified, see `schedule_package()`.
+    Serializations cached for an earlier version of the package, or under a
+    name the package no longer has, are therefore never served. A warm hit
+    costs one or two Redis reads, without touching the database or rdflib.
+
+    :param str package_id: The id or name of the package
+    :param str output: The output format of the serialization
+    :rtype: str|None
+    :return: The serialization, or None when it is not cached
+    """
+    if not _limits()[0] or not package_id:
+        return None
+
+    redis_conn = redis_connection()
+    resolved_id = redis_conn.get(name_key + package_id) or package_id
+    modified, name = redis_conn.hmget(package_key + resolved_id,
+                                      'modified', 'name')
+
+    if not modified or (resolved_id != package_id and name != package_id):
+        return None
+
+    cache_key = (resolved_id, modified, output, get_version())
+
+    try:
+        serialization = _entries.pop(cache_key)
+    except KeyError:
+        return None
+
+    _entries[cache_key] = serialization
+
+    return serialization
+
+
+def put_package(package, output, serialization):
+    """
+    Caches the serialization of a package under its id, `metadata_modified`
+    and output format. Only public and active packages are cached, since the
+    cached serializations are served without checking any permissions.
+
+    The `metadata_modified` and name of the package are only stored in Redis
+    when no modification of the package stored them yet, so that a package
+    shown before a modification never overwrites the version stored by that
+    modification. Its serialization is then cached under the outdated
+    `metadata_modified`, so it is never served and simply ages out of the
+    cache.
+
+    When either the maximum amount of entries or the maximum size in bytes is
+    exceeded, the least recently used serializations are evicted.
+
+    :param dict[str, Any] package: The package which was serialized
+    :param str output: The output format of the serialization
+    :param str serialization: The serialization
+    :rtype: None
+    """
+    max_entries, max_bytes = _limits()
+
+    if not max_entries or len(serialization) > max_bytes:
+        return
+
+    if package.get('private') or package.get('state') != 'active':
+        return
+
+    modified = str(package['metadata_modified'])
+    pipeline = redis_connection().pipeline(transaction=False)
+    pipeline.hsetnx(package_key + package['id'], 'modified', modified)
+    pipeline.hsetnx(package_key + package['id'], 'name', package['name'])
+    pipeline.setnx(name_key + package['name'], package['id'])
+    pipeline.execute()
+
+    cache_key = (package['id'], modified, output, get_version())
+    _usage['bytes'] -= len(_entries.pop(cache_key, ''))
+    _entries[cache_key] = serialization
+    _usage['bytes'] += len(serialization)
+
+    while len(_entries) > max_entries or _usage['bytes'] > max_bytes:
+        _usage['bytes'] -= len(_entries.popitem(last=False)[1])
+
+
+def schedule_package(package, removed=False):
+    """
+    Schedules the invalidation of the cached serializations of a package after
+    it was created, updated, deleted or purged. The `metadata_modified` and
+    name of the package are replaced in Redis once the database transaction
+    which modified the package is committed, so that every process misses on
+    its next request for the package, see `listen()`. A purged package is
+    stored without a `metadata_modified`, so that it is never served again.
+
+    :param Package package: The package which was modified
+    :param bool removed: Whether or not the package was purged
+    :rtype: None
+    """
+    model.Session().info.setdefault(scheduled_key, {})[package.id] = (
+        '' if removed else package.metadata_modified.isoformat(),
+        package.name
+    )
+
+
+def listen():
+    """
+    Registers the handlers which apply the invalidations scheduled by
+    `schedule_package()` when the database session commits, and which discard
+    them when it rolls back.
+
+    :rtype: None
+    """
+    if event.contains(model.Session, 'after_commit', _apply_scheduled):
+        return
+
+    event.listen(model.Session, 'after_commit', _apply_scheduled)
+    event.listen(model.Session, 'after_rollback', _discard_scheduled)
+
+
+def _apply_scheduled(session):
+    """
+    Applies the invalidations scheduled during the transaction the given
+    session just committed.
+
+    :param Session session: The database session
+    :rtype: None
+    """
+    scheduled = session.info.pop(scheduled_key, None)
+
+    if not scheduled:
+        return
+
+    pipeline = redis_connection().pipeline(transaction=False)
+
+    for package_id, (modified, name) in scheduled.iteritems():
+        pipeline.hmset(package_key + package_id,
+                       {'modified': modified, 'name': name})
+        pipeline.set(name_key + name, package_id)
+
+    try:
+        pipeline.execute()
+    except Exception as e:
+        logger.warning('unable to invalidate the cached RDF of %s: %s',
+                       ', '.join(scheduled.keys()), e)
+
+
+def _discard_scheduled(session):
+    """
+    Discards the invalidations scheduled during the transaction the given
+    session just rolled back.
+
+    :param Session session: The database session
+    :rtype: None
+    """
+    session.info.pop(scheduled_key, None)
+
+
+def _limits():
+    """
+    Retrieves the maximum amount of entries and the maximum size in bytes of
+    the package cache of each process. A maximum amount of 0 disables the
+    cache.
+
+    :rtype: (int, int)
+    :return: The maximum amount of entries and the maximum size in bytes
+    """
+    return (
+        int(ckan_config.get('ckan.ckanext-dataoverheid.rdf_cache_entries',
+                            1000)),
+        int(ckan_config.get('ckan.ckanext-dataoverheid.rdf_cache_bytes',
+                            64 * 1024 * 1024))
+    )
+
+
+package_key = redis_key + 'rdf.package.'
+name_key = redis_key + 'rdf.package_name.'
+scheduled_key = 'ckanext.dataoverheid.scheduled_packages'
+_entries = OrderedDict()
+_usage = {'bytes': 0}
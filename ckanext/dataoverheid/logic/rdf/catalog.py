@@ -0,0 +1,568 @@
+# encoding: utf-8
+
+
+import hashlib
+import json
+import logging
+import time
+import urllib
+import uuid
+import ckan.model as model
+import ckan.plugins.toolkit as tk
+from ckan.common import config as ckan_config
+from ckanext.dataoverheid.logic.helpers.config import get_config, \
+    per_version, redis_connection, redis_key
+from ckanext.dataoverheid.logic.rdf import writers
+from ckanext.dataoverheid.logic.rdf.graph_builder import \
+    CatalogDCATGraphBuilder
+from itertools import chain
+from sqlalchemy import event
+
+
+logger = logging.getLogger('ckanext-dataoverheid')
+
+
+def read(output):
+    """
+    Reads the catalog in the given rdflib format from Redis. The catalog is
+    out of date when a dataset changed since it was last assembled, or when the
+    `'dcat'` config changed, see `dcat_version()`. An out of date catalog is
+    still returned, while a single background job brings it up to date, see
+    `refresh()`.
+
+    Only when the catalog was never assembled in the given format is it
+    assembled within the request, by a single process while any other
+    processes wait for it.
+
+    :param str output: The rdflib format
+    :rtype: (str, str)
+    :return: The serialized catalog and whether it was a `'hit'`, a `'stale'`
+             hit or a `'miss'`
+    """
+    redis_conn = redis_connection()
+    key = serialization_key + output
+    serialization, serialized_version, version, config_version = \
+        redis_conn.mget(key, key + '.version', version_key, config_version_key)
+
+    if serialization is not None:
+        if config_version == dcat_version() and \
+                serialized_version == version:
+            return serialization, 'hit'
+
+        _refresh_in_background(output)
+
+        return serialization, 'stale'
+
+    _refresh_in_request(output)
+
+    return redis_conn.get(key) or ''.join(assemble(output)), 'miss'
+
+
+def stream(output):
+    """
+    Streams the catalog in the given rdflib format straight from the fragments
+    of its datasets, so that the memory used is independent of the size of the
+    catalog. Only when the fragments are missing, or were made for another
+    `'dcat'` config, are they rebuilt within the request first, by a single
+    process while any other processes wait for it.
+
+    :param str output: The rdflib format
+    :rtype: (generator of str, str)
+    :return: The serialized catalog in UTF-8 encoded chunks and whether it was
+             a `'hit'` or a `'miss'`
+    """
+    if redis_connection().get(config_version_key) == dcat_version():
+        return writers.chunked(assemble(output)), 'hit'
+
+    _refresh_in_request(output)
+
+    return writers.chunked(assemble(output)), 'miss'
+
+
+def read_page(output, after, url):
+    """
+    Serializes a single page of the catalog in the given rdflib format. The
+    Catalog node is described on every page, together with the links to the
+    other pages and the datasets of the page, ordered by their id.
+
+    The pages are keyed by the id of the last dataset of the previous page, so
+    that every page is read from the index on the package ids regardless of
+    its position in the catalog. The first page is `?page=1`, any other page
+    is `?after={id}`. The last page holds the last datasets of the catalog,
+    and may therefore overlap the page before it.
+
+    The datasets of the page are queried before the serialization is consumed,
+    since it may be consumed after the database session of the request ended.
+
+    :param str output: The rdflib format
+    :param str|None after: The id of the last dataset of the previous page, or
+                           None for the first page
+    :param str url: The URL of the catalog, without the page parameter
+    :rtype: generator of str
+    :return: The serialized page in UTF-8 encoded chunks
+    :raises ObjectNotFound: When no datasets follow the given id
+    """
+    size = page_size()
+    query = _package_query()
+    rows = (query.filter(model.Package.id > after) if after else query)\
+        .order_by(model.Package.id).limit(size + 1).all()
+
+    if after and not rows:
+        raise tk.ObjectNotFound('The catalog has no datasets after {0}'
+                                .format(after))
+
+    links = {'firstPage': _page_parameter(None),
+             'lastPage': _page_parameter(_page_start(query, None, size))}
+
+    if after:
+        links['previousPage'] = _page_parameter(_page_start(query, after,
+                                                            size))
+
+    if len(rows) > size:
+        links['nextPage'] = _page_parameter(rows[size - 1][0])
+
+    names = [name for _, name in rows[:size]]
+    builder = _builder()
+    serialization = chain(
+        [writers.header(output, builder.ns), _catalog_fragment(output),
+         writers.fragment(builder.page_triples(url, _page_parameter(after),
+                                               links, size),
+                          output, builder.ns)],
+        (writers.fragment(builder.package_triples(name), output, builder.ns)
+         for name in names),
+        [writers.footer(output)]
+    )
+
+    return writers.chunked(serialization)
+
+
+def page_size():
+    """
+    Retrieves the maximum amount of datasets on a single page of the catalog.
+
+    :rtype: int
+    :return: The maximum amount of datasets
+    """
+    return max(1, int(ckan_config.get(
+        'ckan.ckanext-dataoverheid.catalog_page_size', 1000
+    )))
+
+
+def refresh(output):
+    """
+    Brings the catalog in the given rdflib format up to date, rebuilding the
+    fragments of all datasets first when the `'dcat'` config changed.
+
+    :param str output: The rdflib format
+    :rtype: None
+    """
+    redis_conn = redis_connection()
+    key = serialization_key + output
+
+    if redis_conn.get(config_version_key) != dcat_version():
+        rebuild()
+
+    version = redis_conn.get(version_key)
+    _store_stream(redis_conn, key, assemble(output))
+    redis_conn.set(key + '.version', version)
+
+
+def refresh_job(output, token):
+    """
+    Brings the catalog in the given rdflib format up to date as a background
+    job, and releases the lock acquired when the job was enqueued. The job is
+    skipped when a request already took over the refresh, because no worker
+    picked up the job in time, see `_refresh_in_background()`. The database
+    session of the job is removed once it is done, since the job owns it.
+
+    :param str output: The rdflib format
+    :param str token: The token of the lock
+    :rtype: None
+    """
+    if not redis_connection().delete(enqueued_key + output):
+        return
+
+    try:
+        refresh(output)
+    finally:
+        _release_lock(output, token)
+        model.Session.remove()
+
+
+def assemble(output):
+    """
+    Assembles the catalog from the fragments of its datasets, one fragment at
+    a time.
+
+    :param str output: The rdflib format
+    :rtype: generator of str
+    :return: The serialized catalog in UTF-8 encoded chunks
+    """
+    yield writers.header(output, _builder().ns)
+    yield _catalog_fragment(output)
+
+    for _, fragment in redis_connection().hscan_iter(fragments_key + output,
+                                                     count=1000):
+        yield fragment
+
+    yield writers.footer(output)
+
+
+def schedule_package(package, removed=False):
+    """
+    Schedules an update of the fragments of a package after it was created,
+    updated, deleted or purged. The update is applied once the database
+    transaction which modified the package is committed, so that the catalog
+    never lists a package which was rolled back, see `listen()`. Packages which
+    were purged, or which are not active or private, are removed from the
+    catalog.
+
+    :param Package package: The package which was modified
+    :param bool removed: Whether or not the package was purged
+    :rtype: None
+    """
+    listed = not removed and package.state == model.State.ACTIVE and \
+        not package.private
+    model.Session().info.setdefault(scheduled_key, {})[package.id] = \
+        package.name if listed else None
+
+
+def listen():
+    """
+    Registers the handlers which apply the updates scheduled by
+    `schedule_package()` when the database session commits, and which discard
+    them when it rolls back.
+
+    :rtype: None
+    """
+    if event.contains(model.Session, 'after_commit', _apply_scheduled):
+        return
+
+    event.listen(model.Session, 'after_commit', _apply_scheduled)
+    event.listen(model.Session, 'after_rollback', _discard_scheduled)
+
+
+def rebuild():
+    """
+    Replaces the fragments of all datasets by those of the active, public
+    packages in the database. The packages are read with the database session
+    of the caller, which remains responsible for removing it.
+
+    :rtype: None
+    """
+    redis_conn = redis_connection()
+    builder = _builder()
+    outputs = formats()
+    config_version = dcat_version()
+    pipeline = redis_conn.pipeline(transaction=False)
+    [pipeline.delete(fragments_key + output + '.building')
+     for output in outputs]
+
+    for idx, (package_id, name) in enumerate(_package_query()
+                                             .yield_per(1000)):
+        [pipeline.hset(fragments_key + output + '.building', package_id,
+                       writers.fragment(builder.package_triples(name), output,
+                                        builder.ns))
+         for output in outputs]
+
+        if idx % 1000 == 999:
+            pipeline.execute()
+
+    pipeline.execute()
+
+    for output in outputs:
+        if redis_conn.exists(fragments_key + output + '.building'):
+            pipeline.rename(fragments_key + output + '.building',
+                            fragments_key + output)
+        else:
+            pipeline.delete(fragments_key + output)
+
+    pipeline.set(config_version_key, config_version)
+    pipeline.incr(version_key)
+    pipeline.execute()
+
+
+@per_version
+def dcat_version():
+    """
+    Computes a hash of the contents of the `'dcat'` config, once per config
+    version. The fragments of the datasets only depend on this config, so they
+    remain valid for as long as the hash remains the same, regardless of the
+    version stamp of the config snapshot.
+
+    :rtype: str
+    :return: The hash of the `'dcat'` config
+    """
+    return hashlib.sha1(json.dumps(get_config('dcat'),
+                                   sort_keys=True)).hexdigest()
+
+
+@per_version
+def formats():
+    """
+    Lists the distinct rdflib formats of the catalog outputs in the config.
+
+    :rtype: list of str
+    :return: The rdflib formats
+    """
+    return sorted(set([details['output_name'] for details
+                       in get_config('dcat')['outputs'].itervalues()]))
+
+
+def _package_query():
+    """
+    Creates the query for the ids and names of the active, public packages.
+
+    :rtype: Query
+    :return: The query
+    """
+    return model.Session.query(model.Package.id, model.Package.name)\
+        .filter(model.Package.state == model.State.ACTIVE)\
+        .filter(model.Package.private == False)  # noqa
+
+
+def _page_start(query, last, size):
+    """
+    Determines the key of the page which ends with the dataset of the given
+    id, or with the last dataset of the catalog when no id is given.
+
+    :param Query query: The query for the ids and names of the packages
+    :param str|None last: The id of the last dataset of the page
+    :param int size: The maximum amount of datasets per page
+    :rtype: str|None
+    :return: The id of the last dataset before the page, or None when the page
+             is the first page
+    """
+    if last:
+        query = query.filter(model.Package.id <= last)
+
+    rows = query.order_by(model.Package.id.desc()).limit(size + 1).all()
+
+    return rows[size][0] if len(rows) > size else None
+
+
+def _page_parameter(after):
+    """
+    Creates the query string of the catalog page following the given id.
+
+    :param str|None after: The id of the last dataset before the page, or None
+                           for the first page
+    :rtype: str
+    :return: The query string, without the leading `?`
+    """
+    if not after:
+        return 'page=1'
+
+    return urllib.urlencode({'after': unicode(after).encode('utf-8')})
+
+
+def _apply_scheduled(session):
+    """
+    Applies the updates of the fragments scheduled during the transaction the
+    given session just committed, incrementing the catalog version once.
+
+    :param Session session: The database session
+    :rtype: None
+    """
+    scheduled = session.info.pop(scheduled_key, None)
+
+    if not scheduled:
+        return
+
+    builder = _builder()
+    pipeline = redis_connection().pipeline(transaction=False)
+
+    for package_id, name in scheduled.iteritems():
+        for output in formats():
+            if name:
+                pipeline.hset(fragments_key + output, package_id,
+                              writers.fragment(builder.package_triples(name),
+                                               output, builder.ns))
+            else:
+                pipeline.hdel(fragments_key + output, package_id)
+
+    pipeline.incr(version_key)
+
+    try:
+        pipeline.execute()
+    except Exception as e:
+        logger.warning('unable to update the catalog fragments of %s: %s',
+                       ', '.join(scheduled.keys()), e)
+
+
+def _discard_scheduled(session):
+    """
+    Discards the updates of the fragments scheduled during the transaction the
+    given session just rolled back.
+
+    :param Session session: The database session
+    :rtype: None
+    """
+    session.info.pop(scheduled_key, None)
+
+
+def _refresh_in_request(output):
+    """
+    Brings the catalog in the given rdflib format up to date within the
+    current request. Only a single process refreshes the catalog, any other
+    process waits until it is done.
+
+    :param str output: The rdflib format
+    :rtype: None
+    """
+    token = _acquire_lock(output)
+
+    if token:
+        try:
+            refresh(output)
+        finally:
+            _release_lock(output, token)
+
+        return
+
+    deadline = time.time() + lock_timeout
+
+    while redis_connection().exists(lock_key + output) and \
+            time.time() < deadline:
+        time.sleep(0.5)
+
+
+def _refresh_in_background(output):
+    """
+    Enqueues a background job refreshing the catalog in the given rdflib
+    format, unless such a job is already enqueued or running.
+
+    When no jobs worker picked up the enqueued job within `pickup_timeout`
+    seconds, the first request to notice takes over the job and refreshes the
+    catalog within the request instead, so that the catalog does not remain
+    out of date without a worker.
+
+    :param str output: The rdflib format
+    :rtype: None
+    """
+    redis_conn = redis_connection()
+    token = _acquire_lock(output)
+
+    if not token:
+        enqueued = (redis_conn.get(enqueued_key + output) or '').split()
+
+        if not enqueued or time.time() - float(enqueued[0]) < pickup_timeout \
+                or not redis_conn.delete(enqueued_key + output):
+            return
+
+        logger.warning('no jobs worker picked up the %s catalog refresh '
+                       'within %s seconds, refreshing it within the request',
+                       output, pickup_timeout)
+
+        try:
+            refresh(output)
+        finally:
+            _release_lock(output, enqueued[1])
+
+        return
+
+    try:
+        redis_conn.set(enqueued_key + output,
+                       '{0} {1}'.format(time.time(), token), ex=lock_timeout)
+        tk.enqueue_job(refresh_job, [output, token],
+                       title='Refresh the {0} catalog'.format(output))
+    except Exception as e:
+        logger.warning('unable to enqueue the %s catalog refresh: %s', output,
+                       e)
+        redis_conn.delete(enqueued_key + output)
+        _release_lock(output, token)
+
+
+def _acquire_lock(output):
+    """
+    Acquires the lock guarding the refresh of the catalog in the given rdflib
+    format. The lock expires after `lock_timeout` seconds, in case its holder
+    never releases it.
+
+    :param str output: The rdflib format
+    :rtype: str|None
+    :return: The token of the lock, or None when the lock is already held
+    """
+    token = uuid.uuid4().hex
+
+    if redis_connection().set(lock_key + output, token, nx=True,
+                              ex=lock_timeout):
+        return token
+
+    return None
+
+
+def _release_lock(output, token):
+    """
+    Releases the lock guarding the refresh of the catalog in the given rdflib
+    format, if it is still held with the given token. The token is compared
+    and the lock deleted within a single script, so that a lock which expired
+    and was acquired by another process in the meantime is never released.
+
+    :param str output: The rdflib format
+    :param str token: The token of the lock
+    :rtype: None
+    """
+    redis_connection().eval(release_script, 1, lock_key + output, token)
+
+
+def _store_stream(redis_conn, key, serialization):
+    """
+    Stores a serialization in Redis as it is being generated. The chunks are
+    appended to a temporary key, which replaces the given key once complete.
+
+    :param Redis redis_conn: The Redis connection
+    :param str key: The key to store the serialization under
+    :param iterable of str serialization: The chunks of the serialization
+    :rtype: None
+    """
+    temporary_key = key + '.building'
+    redis_conn.delete(temporary_key)
+
+    for chunk in writers.chunked(serialization):
+        redis_conn.append(temporary_key, chunk)
+
+    redis_conn.rename(temporary_key, key)
+
+
+@per_version
+def _builder():
+    """
+    Creates the builder of the Catalog node, once per config version.
+
+    :rtype: CatalogDCATGraphBuilder
+    :return: The builder
+    """
+    return CatalogDCATGraphBuilder()
+
+
+@per_version
+def _catalog_fragment(output):
+    """
+    Serializes the Catalog node itself, once per config version.
+
+    :param str output: The rdflib format
+    :rtype: str
+    :return: The UTF-8 encoded fragment
+    """
+    builder = _builder()
+
+    return writers.fragment(sorted(builder.graph.triples((None, None, None))),
+                            output, builder.ns)
+
+
+fragments_key = redis_key + 'rdf.catalog_fragments.'
+serialization_key = redis_key + 'rdf.catalog.'
+version_key = redis_key + 'rdf.catalog_version'
+config_version_key = redis_key + 'rdf.catalog_config_version'
+lock_key = redis_key + 'rdf.catalog_lock.'
+lock_timeout = 600
+enqueued_key = redis_key + 'rdf.catalog_enqueued.'
+pickup_timeout = 60
+release_script = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+scheduled_key = 'ckanext.dataoverheid.scheduled_fragments'
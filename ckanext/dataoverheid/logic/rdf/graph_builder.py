@@ -2,11 +2,65 @@
 
 
 from ckanext.dataoverheid.logic.helpers import config
+from ckanext.dataoverheid.logic.rdf import writers
+from collections import OrderedDict
 from rdflib import Graph, Literal, URIRef, Namespace, BNode
 from rdflib.namespace import NamespaceManager
 
 
-dcat_config = config.get_config('dcat')
+class TripleBuffer(object):
+    """
+    Collects triples for serialization without the indexes of a rdflib Graph,
+    which the builders have no use for. The triples are kept per subject, in
+    the order in which the subjects were first added, so that the writers can
+    group the triples of each subject. As in a Graph, a triple which was
+    already added is ignored, and the membership of a triple can be checked.
+    """
+    def __init__(self):
+        self._subjects = OrderedDict()
+        self._added = set()
+
+    def add(self, triple):
+        """
+        Adds a triple, unless it was already added.
+
+        :param (Any, Any, Any) triple: The triple
+        :rtype: None
+        """
+        if triple in self._added:
+            return
+
+        self._added.add(triple)
+        self._subjects.setdefault(triple[0], []).append(triple)
+
+    def triples(self, pattern=(None, None, None)):
+        """
+        Lists the triples matching a pattern, grouped by subject. None matches
+        any term.
+
+        :param (Any, Any, Any) pattern: The subject, predicate and object to
+                                        match
+        :rtype: generator of (Any, Any, Any)
+        :return: The matching triples
+        """
+        subject, predicate, obj = pattern
+        groups = self._subjects.itervalues() if subject is None \
+            else [self._subjects.get(subject, [])]
+
+        for group in groups:
+            for triple in group:
+                if (predicate is None or triple[1] == predicate) and \
+                        (obj is None or triple[2] == obj):
+                    yield triple
+
+    def __contains__(self, triple):
+        return triple in self._added
+
+    def __len__(self):
+        return len(self._added)
+
+    def __iter__(self):
+        return self.triples()
 
 
 class DCATGraphBuilder:
@@ -16,37 +70,36 @@ class DCATGraphBuilder:
     All namespaces which are part of DCAT-AP-DONL are automatically registered
     and are accessible via a dictionary at `self.ns`, where the dictionary keys
     are the namespace prefixes and their values are the actual Namespaces.
+
+    The triples are collected in a `TripleBuffer` at `self.graph`, unless a
+    rdflib Graph is given to collect them in instead.
     """
-    def __init__(self):
+    def __init__(self, graph=None):
         """
         Initializes the Graph on which to build the DCAT-AP-DONL class and
         registers all namespaces and mappings.
+
+        :param Graph graph: The rdflib Graph to collect the triples in, if any
         """
-        self.graph = Graph()
+        self.dcat_config = config.get_config('dcat')
+        self.graph = TripleBuffer() if graph is None else graph
         self._configure_namespaces()
-        self.dcat_vocabularies = URIRef(dcat_config['vocabularies'])
-        self.language_map = dcat_config['language_map']
-        self.dcat_spec = dcat_config['rdf']
-        self.exclusion = self.dcat_spec['_exclusions']
+        self.dcat_vocabularies = URIRef(self.dcat_config['vocabularies'])
+        self.language_map = self.dcat_config['language_map']
+        self.dcat_spec = self.dcat_config['rdf']
 
     def _configure_namespaces(self):
         """
-        Loads all the registered namespaces from the configuration file at
-        `./config.json` and registers the namespaces and their prefixes in the
-        Graph.
+        Uses the namespaces of the configuration file at `./config.json`, the
+        NamespaceManager binding their prefixes and the frequently used terms
+        shared by all builders, see `shared_namespaces()`.
 
         :rtype: None
         """
-        self.ns = {}
-        namespaces = dcat_config['namespaces']
+        self.ns, ns_manager, self.terms = shared_namespaces()
 
-        for prefix, namespace in namespaces.iteritems():
-            self.ns[prefix] = Namespace(namespace)
-
-        ns_manager = NamespaceManager(self.graph)
-        [ns_manager.bind(prefix.lower(), namespace, override=True)
-         for prefix, namespace in self.ns.iteritems()]
-        self.graph.namespace_manager = ns_manager
+        if isinstance(self.graph, Graph):
+            self.graph.namespace_manager = ns_manager
 
     def add_triple(self, subject, predicate, obj):
         """
@@ -103,7 +156,7 @@ class DCATGraphBuilder:
             return
 
         self.add_triple(subject, predicate,
-                        Literal(number, datatype=self.ns['XSD'].decimal))
+                        Literal(number, datatype=self.terms['XSD.decimal']))
 
     def add_datetime_literal(self, subject, predicate, datetime):
         """
@@ -124,7 +177,7 @@ class DCATGraphBuilder:
             return
 
         self.add_triple(subject, predicate,
-                        Literal(datetime, datatype=self.ns['XSD'].datetime))
+                        Literal(datetime, datatype=self.terms['XSD.datetime']))
 
     def add_uri(self, subject, predicate, uri, vocabulary=None):
         """
@@ -153,9 +206,9 @@ class DCATGraphBuilder:
         uri = URIRef(uri)
 
         if vocabulary:
-            self.add_triple(uri, self.ns['RDFS'].isDefinedBy,
+            self.add_triple(uri, self.terms['RDFS.isDefinedBy'],
                             self.dcat_vocabularies)
-            self.add_triple(uri, self.ns['RDF'].type, vocabulary)
+            self.add_triple(uri, self.terms['RDF.type'], vocabulary)
 
         self.add_triple(subject, predicate, uri)
 
@@ -183,240 +236,163 @@ class DCATGraphBuilder:
 
     def as_(self, output):
         """
-        Attempts to output the current Graph in the given output style.
+        Attempts to output the current Graph in the given output style. The
+        triples of a `TripleBuffer` are serialized by the writers of
+        `ckanext.dataoverheid.logic.rdf.writers`, those of a rdflib Graph by
+        rdflib itself.
 
         :param str output: The output format of the Graph
         :rtype: str
         :return: The serialized Graph in the given format
         """
-        return self.graph.serialize(format=output)
+        if isinstance(self.graph, Graph):
+            return self.graph.serialize(format=output)
+
+        return ''.join(writers.serialize(self.graph.triples(), output,
+                                         self.ns))
 
-    def _process_class(self, target, spec, package, parent=None,
+    def _process_class(self, target, class_name, package, parent=None,
                        allow_empty=False):
         """
-        Processes one of the DCAT-AP-DONL classes and add it to the Graph.
+        Processes one of the DCAT-AP-DONL classes and add it to the Graph,
+        according to its mapping plan, see `_mapping_plan()`.
 
         :param Any target: The Node which acts as the subject of triples
-        :param dict[Any, Any] spec: The specification for translating CKAN to
-                                    DCAT
+        :param str class_name: The name of the class in the specification for
+                               translating CKAN to DCAT
         :param dict[Any, Any] package: The complete CKAN package to model
         :param Any parent: The parent node to add the created Node to
         :param bool allow_empty: Whether or not to allow the created Node to be
                                  empty
         :rtype: None
         """
-        has_properties = any((prop in package for prop in spec.keys()))
-        class_spec = spec['class']
+        keys, class_uri, mapping, parent_predicate = _mapping_plan(class_name)
 
-        if not allow_empty and not has_properties:
+        if not allow_empty and not any(key in package for key in keys):
             return
 
-        self.add_triple(target, self.ns['RDF'].type,
-                        self.ns[class_spec['namespace']][class_spec['name']])
+        self.add_triple(target, self.terms['RDF.type'], class_uri)
 
-        for ckan_property, rdf_details in spec.iteritems():
-            if ckan_property in self.exclusion:
-                continue
-
-            current_type = rdf_details['type']
-            prop = rdf_details['property']
-            ns = rdf_details['namespace']
-
-            if current_type == 'literal':
-                prefix = rdf_details['prefix']
-
-                self._add_literal_to(target, self.ns[ns][prop], prefix,
-                                     ckan_property, package,
-                                     package['metadata_language'])
-            elif current_type == 'number':
-                self._add_number_literal_to(target, self.ns[ns][prop],
-                                            ckan_property, package,)
-            elif current_type == 'datetime':
-                prefix = rdf_details['prefix']
-
-                self._add_datetime_literal_to(target, self.ns[ns][prop],
-                                              prefix, ckan_property, package)
-            elif current_type == 'uri':
-                prefix = rdf_details['prefix']
-
-                self._add_uri_to(target, self.ns[ns][prop], prefix,
-                                 ckan_property, package)
-            elif current_type == 'resource':
-                classname = rdf_details['class']
-                prefix = rdf_details['prefix']
-
-                vocabulary = self.ns[classname['namespace']][classname['name']]
-
-                self._add_uri_to(target, self.ns[ns][prop], prefix,
-                                 ckan_property, package, vocabulary)
-            elif current_type == 'boolean':
-                classname = rdf_details['class']
-
-                self._add_boolean_to(target, self.ns[ns][prop], ckan_property,
-                                     package, classname['namespace'],
-                                     classname['name'])
+        for ckan_property, predicate, emitter, prefix, vocabulary in mapping:
+            emitter(self, target, predicate, package.get(ckan_property),
+                    prefix, vocabulary, package)
 
         if parent:
-            self.add_triple(parent,
-                            self.ns[spec['namespace']][spec['property']],
-                            target)
+            self.add_triple(parent, parent_predicate, target)
 
-    def _add_literal_to(self, target, predicate, prefix, prop, package,
-                        language=None):
+    def _emit_literal(self, target, predicate, value, prefix, vocabulary,
+                      package):
         """
-        Adds a Literal node to the given target Node.
+        Adds the value of a CKAN property as Literal nodes, in the metadata
+        language of the package.
 
         :param Any target: The Node target of the triple
         :param Any predicate: The namespaced verb of the triple
+        :param Any value: The value of the CKAN property
         :param str prefix: The prefix to prepend to the value
-        :param Any prop: The property holding the value of the Literal
-        :param dict[str, Any] package:  The CKAN package
-        :param Any language: The language of the Literal
+        :param Any vocabulary: Not used
+        :param dict[str, Any] package: The CKAN package
         :rtype: None
         """
-        try:
-            value = package[prop]
+        if value is not None:
+            self.add_literal(target, predicate, _prefixed(prefix, value),
+                             package['metadata_language'])
 
-            if value is None:
-                return
-
-            if isinstance(value, list):
-                self.add_literal(target, predicate,
-                                 [prefix + val['display_name']
-                                  if isinstance(val, dict) else
-                                  prefix + val for val in value], language)
-                return
-
-            self.add_literal(target, predicate, (prefix + value['display_name']
-                                                 if isinstance(value, dict)
-                                                 else prefix + value), language)
-        except KeyError:
-            return
-
-    def _add_number_literal_to(self, target, predicate, prop, package):
+    def _emit_number_literal(self, target, predicate, value, prefix,
+                             vocabulary, package):
         """
-        Adds a Literal node with the XSD.Decimal type to the given target Node.
+        Adds the value of a CKAN property as Literal nodes with the XSD.Decimal
+        type.
 
         :param Any target: The Node target of the triple
         :param Any predicate: The namespaced verb of the triple
-        :param Any prop: The property holding the value of the Literal
-        :param dict[str, Any] package: The CKAN package
+        :param Any value: The value of the CKAN property
+        :param str prefix: Not used
+        :param Any vocabulary: Not used
+        :param dict[str, Any] package: Not used
         :rtype: None
         """
-        try:
-            value = package[prop]
-
-            if value is None:
-                return
-
-            if isinstance(value, list):
-                self.add_number_literal(target, predicate,
-                                        [str(val['display_name'])
-                                         if isinstance(val, dict)
-                                         else str(val) for val in value])
-                return
+        if value is None:
+            return
 
-            self.add_number_literal(target, predicate, str(value))
-        except KeyError:
+        if isinstance(value, list):
+            self.add_number_literal(target, predicate, [
+                str(val['display_name']) if isinstance(val, dict) else str(val)
+                for val in value
+            ])
             return
 
-    def _add_datetime_literal_to(self, target, predicate, prefix, prop,
-                                 package):
+        self.add_number_literal(target, predicate, str(value))
+
+    def _emit_datetime_literal(self, target, predicate, value, prefix,
+                               vocabulary, package):
         """
-        Adds a Literal node with the XSD.DateTime type to the given target Node.
+        Adds the value of a CKAN property as Literal nodes with the
+        XSD.DateTime type.
 
         :param Any target: The Node target of the triple
         :param Any predicate: The namespaced verb of the triple
+        :param Any value: The value of the CKAN property
         :param str prefix: The prefix to prepend to the value
-        :param Any prop: The property holding the value of the Literal
-        :param dict[str, Any] package: The CKAN package
+        :param Any vocabulary: Not used
+        :param dict[str, Any] package: Not used
         :rtype: None
         """
-        try:
-            value = package[prop]
-
-            if value is None:
-                return
-
-            if isinstance(value, list):
-                self.add_datetime_literal(target, predicate,
-                                          [prefix + val['display_name']
-                                           if isinstance(val, dict)
-                                           else prefix + val for val in value])
-                return
-
-            self.add_datetime_literal(target, predicate, prefix + value)
-        except KeyError:
-            return
+        if value is not None:
+            self.add_datetime_literal(target, predicate,
+                                      _prefixed(prefix, value))
 
-    def _add_uri_to(self, target, predicate, prefix, prop, package,
-                    vocabulary=None):
+    def _emit_uri(self, target, predicate, value, prefix, vocabulary,
+                  package):
         """
-        Adds a RDF Resource to the Graph.
+        Adds the value of a CKAN property as RDF Resources, of the given
+        vocabulary if any.
 
         :param Any target: The Node target of the triple
         :param Any predicate: The namespaced verb of the triple
-        :param str prefix: The value to prefix
-        :param Any prop: The property in the CKAN package holding the value to
-                         add
-        :param dict[str, Any] package: The CKAN package
-        :param Any vocabulary: The vocabulary of the node to add
-        :rtype: void
+        :param Any value: The value of the CKAN property
+        :param str prefix: The prefix to prepend to the value
+        :param Any vocabulary: The vocabulary of the Resources
+        :param dict[str, Any] package: Not used
+        :rtype: None
         """
-        try:
-            value = package[prop]
-
-            if value is None:
-                return
-
-            if isinstance(value, list):
-                self.add_uri(target, predicate,
-                             [prefix + val['display_name']
-                              if isinstance(val, dict) else prefix + val
-                              for val in value], vocabulary)
-                return
-
-            self.add_uri(target, predicate, prefix + value, vocabulary)
-        except KeyError:
-            return
+        if value is not None:
+            self.add_uri(target, predicate, _prefixed(prefix, value),
+                         vocabulary)
 
-    def _add_boolean_to(self, target, predicate, prop, package, class_ns,
-                        class_name):
+    def _emit_boolean(self, target, predicate, value, prefix, vocabulary,
+                      package):
         """
-        Adds a node to the target node which represents a boolean.
+        Adds the given class node to the target node when the value of a CKAN
+        property is true.
 
         :param Any target: The Node target of the triple
         :param Any predicate: The namespaced verb of the triple
-        :param Any prop: The property holding the value
-        :param dict[str, Any] package: The CKAN package
-        :param str class_ns: The namespace prefix
-        :param str class_name: The name of the class
+        :param Any value: The value of the CKAN property
+        :param str prefix: Not used
+        :param Any vocabulary: The class representing the boolean
+        :param dict[str, Any] package: Not used
         :rtype: None
         """
-        is_string_bool = package[prop] == u'true' or package[prop] == u'True'
-
-        try:
-            if is_string_bool or package[prop] is True:
-                self.add_triple(target, predicate,
-                                self.ns[class_ns][class_name])
-        except KeyError:
-            return
+        if value is True or value == u'true' or value == u'True':
+            self.add_triple(target, predicate, vocabulary)
 
 
 class DatasetDCATGraphBuilder(DCATGraphBuilder):
     """
     Enables the modelling of a CKAN package into a valid DCAT-AP-DONL RDF model.
     """
-    def __init__(self, dataset_name):
+    def __init__(self, dataset_name, graph=None):
         """
         Initializes the Graph and prepares it for modelling a DCAT-AP-DONL
         Dataset.
 
         :param str dataset_name: The name of the dataset being modelled
+        :param Graph graph: The rdflib Graph to collect the triples in, if any
         """
-        DCATGraphBuilder.__init__(self)
+        DCATGraphBuilder.__init__(self, graph)
         self.dataset = URIRef(
-            dcat_config['templates']['identifier'].format(dataset_name)
+            self.dcat_config['templates']['identifier'].format(dataset_name)
         )
 
     def parse_ckan_package(self, package):
@@ -431,24 +407,21 @@ class DatasetDCATGraphBuilder(DCATGraphBuilder):
         :param dict[str, Any] package: The complete CKAN package to model
         :rtype: None
         """
-        dataset_spec = self.dcat_spec['dataset']
-        spec_class = dataset_spec['class']
-        identifier_template = dcat_config['templates']['identifier']
+        identifier_template = self.dcat_config['templates']['identifier']
 
-        self.add_triple(self.dataset, self.ns['RDF'].type,
-                        self.ns[spec_class['namespace']][spec_class['name']])
-        self.add_uri(self.dataset, self.ns['RDFS'].isDefinedBy,
+        self.add_uri(self.dataset, self.terms['RDFS.isDefinedBy'],
                      identifier_template.format(package['name']))
-        self.add_uri(self.dataset, self.ns['RDFS'].isDefinedBy,
+        self.add_uri(self.dataset, self.terms['RDFS.isDefinedBy'],
                      identifier_template.format(package['id']))
 
-        self._process_class(self.dataset, dataset_spec, package)
+        self._process_class(self.dataset, 'dataset', package,
+                            allow_empty=True)
         self._add_catalog_record_to_graph(package)
 
         for entity in ['contactPoint', 'temporal', 'legalBases']:
             node_id = 'dataset.' + package['name'] + '.' + entity
 
-            self._process_class(BNode(node_id), self.dcat_spec[entity],
+            self._process_class(BNode(node_id), entity,
                                 package, parent=self.dataset, allow_empty=False)
 
         for idx, resource in enumerate(package['resources']):
@@ -460,7 +433,7 @@ class DatasetDCATGraphBuilder(DCATGraphBuilder):
         """
         Creates a CatalogRecord from the given CKAN package and adds it to the
         Graph. The mapping from CKAN package to DCAT CatalogRecord is found in
-        `DatasetDCATGraphBuilder.dcat_spec['catalogRecord']`.
+        the `catalogRecord` class of the `dcat.rdf` specification.
 
         Note: The CatalogRecord is identified by the `id` of a CKAN package, a
         Dataset is identified by its `name`. This ensures that both the
@@ -471,16 +444,16 @@ class DatasetDCATGraphBuilder(DCATGraphBuilder):
         :param dict[str, Any] package: The complete CKAN package to model
         :rtype: None
         """
-        templates = dcat_config['templates']
+        templates = self.dcat_config['templates']
         catalog_record = URIRef(templates['identifier'].format(package['id']))
 
-        self.add_uri(catalog_record, self.ns['RDFS'].isDefinedBy,
+        self.add_uri(catalog_record, self.terms['RDFS.isDefinedBy'],
                      templates['dataset_definition'].format(package['name']))
-        self.add_uri(catalog_record, self.ns['RDFS'].isDefinedBy,
+        self.add_uri(catalog_record, self.terms['RDFS.isDefinedBy'],
                      templates['dataset_definition'].format(package['id']))
-        self.add_triple(catalog_record, self.ns['FOAF'].primaryTopic,
+        self.add_triple(catalog_record, self.terms['FOAF.primaryTopic'],
                         self.dataset)
-        self._process_class(catalog_record, self.dcat_spec['catalogRecord'],
+        self._process_class(catalog_record, 'catalogRecord',
                             package, parent=None, allow_empty=False)
 
     def _add_fallback_alternate_identifiers(self, package_id, package_name):
@@ -492,20 +465,21 @@ class DatasetDCATGraphBuilder(DCATGraphBuilder):
         :param str package_name: The name of the CKAN package
         :rtype: None
         """
-        donl = self.ns['DONL']
+        templates = self.dcat_config['templates']
 
-        for identifier in dcat_config['templates']['alternate_identifiers']:
-            tup = (self.dataset, donl.identifier, identifier.format(package_id))
+        for identifier in templates['alternate_identifiers']:
+            tup = (self.dataset, self.terms['DONL.identifier'],
+                   identifier.format(package_id))
 
             if tup not in self.graph:
-                self.add_uri(self.dataset, self.ns['ADMS'].identifier,
+                self.add_uri(self.dataset, self.terms['ADMS.identifier'],
                              identifier.format(package_id))
 
-            tup = (self.dataset, donl.identifier,
+            tup = (self.dataset, self.terms['DONL.identifier'],
                    identifier.format(package_name))
 
             if tup not in self.graph:
-                self.add_uri(self.dataset, self.ns['ADMS'].identifier,
+                self.add_uri(self.dataset, self.terms['ADMS.identifier'],
                              identifier.format(package_name))
 
     def _parse_ckan_resource(self, target, package, resource_index):
@@ -517,21 +491,21 @@ class DatasetDCATGraphBuilder(DCATGraphBuilder):
         :param int resource_index: The position of the resource in the package
         :rtype: None
         """
-        dataset_def = dcat_config['templates']['dataset_definition']
+        dataset_def = self.dcat_config['templates']['dataset_definition']
         distribution = BNode('dataset.' + package['name'] + '.distribution.' +
                              str(resource_index + 1))
 
-        self.add_uri(distribution, self.ns['RDFS'].isDefinedBy,
+        self.add_uri(distribution, self.terms['RDFS.isDefinedBy'],
                      dataset_def.format(package['name']))
-        self.add_uri(distribution, self.ns['RDFS'].isDefinedBy,
+        self.add_uri(distribution, self.terms['RDFS.isDefinedBy'],
                      dataset_def.format(package['id']))
         self._process_class(BNode('dataset.' + package['name'] +
                                   '.distribution.' + str(resource_index + 1) +
                                   '.checksum'),
-                            self.dcat_spec['checksum'],
+                            'checksum',
                             package['resources'][resource_index],
                             parent=distribution, allow_empty=False)
-        self._process_class(distribution, self.dcat_spec['distribution'],
+        self._process_class(distribution, 'distribution',
                             package['resources'][resource_index], parent=target,
                             allow_empty=False)
 
@@ -540,19 +514,21 @@ class CatalogDCATGraphBuilder(DCATGraphBuilder):
     """
     Enables the modelling of an entire catalog as a DCAT Catalog.
     """
-    def __init__(self):
+    def __init__(self, graph=None):
         """
         Processes the DCAT Catalog class and adds it to the new Graph.
+
+        :param Graph graph: The rdflib Graph to collect the triples in, if any
         """
-        DCATGraphBuilder.__init__(self)
-        self.catalog_config = dcat_config['catalog_data']
+        DCATGraphBuilder.__init__(self, graph)
+        self.catalog_config = self.dcat_config['catalog_data']
         self.catalog = URIRef(self.catalog_config['identifier'])
 
         spec = self.dcat_spec['catalog']
 
-        self.add_uri(self.catalog, self.ns['RDFS'].isDefinedBy,
+        self.add_uri(self.catalog, self.terms['RDFS.isDefinedBy'],
                      spec['class']['definition'])
-        self._process_class(self.catalog, spec, self.catalog_config,
+        self._process_class(self.catalog, 'catalog', self.catalog_config,
                             parent=None, allow_empty=False)
 
     def add_ckan_packages(self, packages):
@@ -563,12 +539,164 @@ class CatalogDCATGraphBuilder(DCATGraphBuilder):
         :rtype: None
         """
         for package in packages:
-            dataset = URIRef(dcat_config['templates']['identifier']
-                             .format(package))
-
-            self.add_uri(dataset, self.ns['RDFS'].isDefinedBy,
-                         dcat_config['templates']['dataset_definition']
-                         .format(package))
-            self.add_uri(dataset, self.ns['RDF'].type,
-                         self.ns['DONL']['Dataset'])
-            self.add_triple(self.catalog, self.ns['DCAT']['dataset'], dataset)
+            [self.add_triple(*triple)
+             for triple in self.package_triples(package)]
+
+    def package_triples(self, package):
+        """
+        Creates the triples which add a CKAN package to the Catalog node.
+
+        :param str package: The name of the CKAN package
+        :rtype: list of (Any, Any, Any)
+        :return: The triples
+        """
+        templates = self.dcat_config['templates']
+        dataset = URIRef(templates['identifier'].format(package))
+
+        return [
+            (dataset, self.terms['RDFS.isDefinedBy'],
+             URIRef(templates['dataset_definition'].format(package))),
+            (dataset, self.terms['RDF.type'], self.terms['DONL.Dataset']),
+            (self.catalog, self.terms['DCAT.dataset'], dataset)
+        ]
+
+    def page_triples(self, url, page, links, page_size):
+        """
+        Creates the triples describing a single page of the catalog as a Hydra
+        PagedCollection, linking to the first, last, previous and next pages.
+
+        :param str url: The URL of the catalog, without the page parameter
+        :param str page: The query string of the page
+        :param dict[str, str] links: The query strings of the linked pages,
+                                     keyed by their Hydra property, e.g.
+                                     `'nextPage'`
+        :param int page_size: The maximum amount of packages per page
+        :rtype: list of (Any, Any, Any)
+        :return: The triples
+        """
+        hydra = self.ns['HYDRA']
+        page_uri = URIRef('{0}?{1}'.format(url, page))
+
+        return [
+            (page_uri, self.terms['RDF.type'], hydra.PagedCollection),
+            (page_uri, hydra.itemsPerPage,
+             Literal(page_size, datatype=self.terms['XSD.integer']))
+        ] + [(page_uri, hydra[link], URIRef('{0}?{1}'.format(url, query)))
+             for link, query in sorted(links.iteritems())]
+
+
+@config.per_version
+def shared_namespaces():
+    """
+    Creates the namespaces of the configuration file at `./config.json`, a
+    NamespaceManager binding their prefixes and the terms used by every
+    builder, once per config version. Building these for every Graph costs
+    more than building the triples of a small package. The shared
+    NamespaceManager also shares its cache of computed qnames.
+
+    The namespaces and terms are shared by all builders of this process, and
+    should therefore not be modified.
+
+    :rtype: (dict[str, Namespace], NamespaceManager, dict[str, URIRef])
+    :return: The namespaces keyed by their prefix, the NamespaceManager and the
+             terms keyed by their prefixed name
+    """
+    ns = {prefix: Namespace(namespace) for prefix, namespace
+          in config.get_config('dcat')['namespaces'].iteritems()}
+
+    ns_manager = NamespaceManager(Graph())
+    [ns_manager.bind(prefix.lower(), namespace, override=True)
+     for prefix, namespace in ns.iteritems()]
+
+    terms = {'{0}.{1}'.format(prefix, name): ns[prefix][name]
+             for prefix, name in shared_terms}
+
+    return ns, ns_manager, terms
+
+
+@config.per_version
+def _mapping_plan(class_name):
+    """
+    Compiles the mapping of a DCAT-AP-DONL class from the `dcat.rdf`
+    specification, once per config version. The properties of the class are
+    flattened into tuples holding the CKAN property, the predicate, the method
+    emitting the triples, the prefix of the value and the vocabulary, with all
+    namespaced terms resolved in advance.
+
+    :param str class_name: The name of the class in the specification
+    :rtype: (tuple of str, URIRef, tuple of tuple, URIRef|None)
+    :return: The keys of the specification of the class, the class itself,
+             its mapping and the predicate linking it to a parent node
+    """
+    dcat_config = config.get_config('dcat')
+    ns = shared_namespaces()[0]
+    exclusions = dcat_config['rdf']['_exclusions']
+    spec = dcat_config['rdf'][class_name]
+    class_spec = spec['class']
+    mapping = []
+
+    for ckan_property, rdf_details in spec.iteritems():
+        if ckan_property in exclusions \
+                or rdf_details['type'] not in emitters:
+            continue
+
+        vocabulary = None
+
+        if rdf_details['type'] in ['resource', 'boolean']:
+            classname = rdf_details['class']
+            vocabulary = ns[classname['namespace']][classname['name']]
+
+        mapping.append((
+            ckan_property,
+            ns[rdf_details['namespace']][rdf_details['property']],
+            emitters[rdf_details['type']],
+            rdf_details.get('prefix', ''),
+            vocabulary
+        ))
+
+    parent_predicate = ns[spec['namespace']][spec['property']] \
+        if 'namespace' in spec and 'property' in spec else None
+
+    class_uri = ns[class_spec['namespace']][class_spec['name']]
+
+    return tuple(spec.keys()), class_uri, tuple(mapping), parent_predicate
+
+
+def _prefixed(prefix, value):
+    """
+    Prepends a prefix to a value, or to every entry of a list of values. Values
+    which are dictionaries are represented by their `display_name`.
+
+    :param str prefix: The prefix to prepend
+    :param Any value: The value or list of values
+    :rtype: Any
+    :return: The prefixed value or list of values
+    """
+    if isinstance(value, list):
+        return [prefix + val['display_name'] if isinstance(val, dict)
+                else prefix + val for val in value]
+
+    return prefix + value['display_name'] if isinstance(value, dict) \
+        else prefix + value
+
+
+shared_terms = [
+    ('RDF', 'type'),
+    ('RDFS', 'isDefinedBy'),
+    ('XSD', 'decimal'),
+    ('XSD', 'datetime'),
+    ('XSD', 'integer'),
+    ('DONL', 'Dataset'),
+    ('DONL', 'identifier'),
+    ('ADMS', 'identifier'),
+    ('FOAF', 'primaryTopic'),
+    ('DCAT', 'dataset')
+]
+emitters = {
+    'literal': DCATGraphBuilder._emit_literal,
+    'number': DCATGraphBuilder._emit_number_literal,
+    'datetime': DCATGraphBuilder._emit_datetime_literal,
+    'uri': DCATGraphBuilder._emit_uri,
+    'resource': DCATGraphBuilder._emit_uri,
+    'boolean': DCATGraphBuilder._emit_boolean
+}
@@ -0,0 +1,452 @@
+# encoding: utf-8
+
+
+import json
+import re
+from collections import OrderedDict
+from itertools import chain, groupby
+from xml.sax.saxutils import escape, quoteattr
+from rdflib import BNode, Literal
+from rdflib.namespace import RDF
+
+
+def serialize(triples, output, namespaces):
+    """
+    Serializes the given triples one subject at a time, without collecting
+    them in a Graph. The memory used is therefore independent of the amount of
+    triples. Triples sharing a subject are only grouped when they follow each
+    other.
+
+    :param iterable of (Any, Any, Any) triples: The triples to serialize
+    :param str output: The output format; `'xml'`, `'n3'`, `'turtle'`, `'nt'`
+                       or `'json-ld'`
+    :param dict[str, Any] namespaces: The namespaces to declare, keyed by their
+                                      prefix
+    :rtype: generator of str
+    :return: The serialization in UTF-8 encoded chunks
+    """
+    prefixes = _prefixes(namespaces)
+    write_header, write_body, footer = writers[output]
+
+    return chain([write_header(prefixes)], write_body(triples, prefixes),
+                 [footer])
+
+
+def header(output, namespaces):
+    """
+    Serializes the start of a document, up to its first triple.
+
+    :param str output: The output format
+    :param dict[str, Any] namespaces: The namespaces to declare, keyed by their
+                                      prefix
+    :rtype: str
+    :return: The UTF-8 encoded start of the document
+    """
+    return writers[output][0](_prefixes(namespaces))
+
+
+def fragment(triples, output, namespaces):
+    """
+    Serializes triples without the start and end of a document, so that the
+    fragment can be placed between the header and footer of a document.
+
+    :param iterable of (Any, Any, Any) triples: The triples to serialize
+    :param str output: The output format
+    :param dict[str, Any] namespaces: The namespaces to declare, keyed by their
+                                      prefix
+    :rtype: str
+    :return: The UTF-8 encoded fragment
+    """
+    return ''.join(writers[output][1](triples, _prefixes(namespaces)))
+
+
+def footer(output):
+    """
+    Serializes the end of a document, after its last triple.
+
+    :param str output: The output format
+    :rtype: str
+    :return: The UTF-8 encoded end of the document
+    """
+    return writers[output][2]
+
+
+def chunked(serialization, chunk_size=65536):
+    """
+    Combines the small chunks of a serialization into chunks of roughly the
+    given size.
+
+    :param iterable of str serialization: The serialization
+    :param int chunk_size: The minimal size of a chunk in bytes
+    :rtype: generator of str
+    :return: The serialization in larger chunks
+    """
+    chunk = []
+    size = 0
+
+    for part in serialization:
+        chunk.append(part)
+        size += len(part)
+
+        if size >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+
+    if chunk:
+        yield ''.join(chunk)
+
+
+def xml_header(prefixes):
+    """
+    Serializes the start of a RDF/XML document, declaring all namespaces.
+
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: str
+    :return: The UTF-8 encoded start of the document
+    """
+    declarations = u''.join([u'\n   xmlns:{0}={1}'.format(
+        prefix, quoteattr(namespace)
+    ) for namespace, prefix in sorted(prefixes.iteritems(),
+                                      key=lambda ns: ns[1])])
+
+    return u'<?xml version="1.0" encoding="UTF-8"?>\n' \
+           u'<rdf:RDF{0}\n>\n'.format(declarations).encode('utf-8')
+
+
+def write_xml(triples, prefixes):
+    """
+    Serializes triples as RDF/XML, with a `rdf:Description` per subject.
+
+    :param iterable of (Any, Any, Any) triples: The triples to serialize
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: generator of str
+    :return: The serialization in UTF-8 encoded chunks
+    """
+    for subject, subject_triples in groupby(triples, lambda triple: triple[0]):
+        lines = [u'  <rdf:Description {0}>\n'.format(_xml_node(subject))]
+
+        for _, predicate, obj in subject_triples:
+            namespace, name = _split_uri(predicate)
+            tag = u'{0}:{1}'.format(prefixes[namespace], name) \
+                if namespace in prefixes else u'ns0:' + name
+            declaration = u'' if namespace in prefixes \
+                else u' xmlns:ns0={0}'.format(quoteattr(namespace))
+
+            if isinstance(obj, Literal):
+                lines.append(u'    <{0}{1}{2}>{3}</{0}>\n'.format(
+                    tag, declaration, _xml_literal_attribute(obj), escape(obj)
+                ))
+            else:
+                lines.append(u'    <{0}{1} {2}/>\n'.format(
+                    tag, declaration, _xml_node(obj, 'rdf:resource')
+                ))
+
+        lines.append(u'  </rdf:Description>\n')
+
+        yield u''.join(lines).encode('utf-8')
+
+
+def turtle_header(prefixes):
+    """
+    Serializes the start of a Turtle document, declaring all prefixes.
+
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: str
+    :return: The UTF-8 encoded start of the document
+    """
+    return u''.join([u'@prefix {0}: <{1}> .\n'.format(prefix, namespace)
+                     for namespace, prefix in sorted(prefixes.iteritems(),
+                                                     key=lambda ns: ns[1])]
+                    + [u'\n']).encode('utf-8')
+
+
+def write_turtle(triples, prefixes):
+    """
+    Serializes triples as Turtle, which is also valid N3.
+
+    :param iterable of (Any, Any, Any) triples: The triples to serialize
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: generator of str
+    :return: The serialization in UTF-8 encoded chunks
+    """
+    for subject, subject_triples in groupby(triples, lambda triple: triple[0]):
+        yield (_nt_term(subject) + u' ' + u' ;\n    '.join([
+            _turtle_predicate(predicate, prefixes) + u' ' + _nt_term(obj)
+            for _, predicate, obj in subject_triples
+        ]) + u' .\n\n').encode('utf-8')
+
+
+def nt_header(prefixes):
+    """
+    N-Triples documents have no header.
+
+    :param dict[unicode, unicode] prefixes: Not used
+    :rtype: str
+    :return: An empty string
+    """
+    return ''
+
+
+def write_nt(triples, prefixes):
+    """
+    Serializes triples as N-Triples, a single line per triple.
+
+    :param iterable of (Any, Any, Any) triples: The triples to serialize
+    :param dict[unicode, unicode] prefixes: Not used
+    :rtype: generator of str
+    :return: The serialization in UTF-8 encoded chunks
+    """
+    for subject, predicate, obj in triples:
+        yield u'{0} {1} {2} .\n'.format(_nt_term(subject), _nt_term(predicate),
+                                        _nt_term(obj)).encode('utf-8')
+
+
+def jsonld_header(prefixes):
+    """
+    Serializes the start of a JSON-LD document, declaring all prefixes in its
+    context.
+
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: str
+    :return: The UTF-8 encoded start of the document
+    """
+    context = OrderedDict([(prefix, namespace) for namespace, prefix
+                           in sorted(prefixes.iteritems(),
+                                     key=lambda ns: ns[1])])
+
+    return '{{"@context":{0},\n"@graph":[\n'.format(json.dumps(
+        context, separators=(',', ':')
+    ))
+
+
+def write_jsonld(triples, prefixes):
+    """
+    Serializes triples as the node objects of a JSON-LD document, a single line
+    per subject. Every node object is followed by a comma, which is why the
+    footer of the document ends the `@graph` with an empty node object.
+
+    :param iterable of (Any, Any, Any) triples: The triples to serialize
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: generator of str
+    :return: The serialization in UTF-8 encoded chunks
+    """
+    for subject, subject_triples in groupby(triples, lambda triple: triple[0]):
+        node = OrderedDict([('@id', _jsonld_id(subject))])
+
+        for _, predicate, obj in subject_triples:
+            if predicate == rdf_type and not isinstance(obj, (BNode, Literal)):
+                node.setdefault('@type', []).append(_jsonld_iri(obj, prefixes))
+            else:
+                node.setdefault(_jsonld_iri(predicate, prefixes), []).append(
+                    _jsonld_value(obj, prefixes)
+                )
+
+        yield json.dumps(node, separators=(',', ':')) + ',\n'
+
+
+def _prefixes(namespaces):
+    """
+    Maps the given namespaces to their prefixes, lowercasing the prefixes as
+    is done when binding them to a Graph.
+
+    :param dict[str, Any] namespaces: The namespaces keyed by their prefix
+    :rtype: dict[unicode, unicode]
+    :return: The prefixes keyed by their namespace
+    """
+    prefixes = {unicode(namespace): prefix.lower()
+                for prefix, namespace in namespaces.iteritems()}
+    prefixes[u'http://www.w3.org/1999/02/22-rdf-syntax-ns#'] = u'rdf'
+
+    return prefixes
+
+
+def _split_uri(uri):
+    """
+    Splits a URI into its namespace and its local name, after the last `'#'`
+    or `'/'`.
+
+    :param unicode uri: The URI to split
+    :rtype: (unicode, unicode)
+    :return: The namespace and the local name
+    """
+    match = local_name.search(uri)
+
+    if not match:
+        raise ValueError('unable to split {0} into a namespace and a local '
+                         'name'.format(uri))
+
+    return uri[:match.start()], match.group()
+
+
+def _node_id(node):
+    """
+    Converts the id of a BNode into an id which is valid in all the supported
+    output formats.
+
+    :param BNode node: The BNode
+    :rtype: unicode
+    :return: The converted id
+    """
+    return u'b' + node.encode('utf-8').encode('hex')
+
+
+def _xml_node(node, attribute='rdf:about'):
+    """
+    Creates the attribute referencing a node in RDF/XML.
+
+    :param Any node: The URIRef or BNode to reference
+    :param str attribute: The attribute to use for URIRefs
+    :rtype: unicode
+    :return: The attribute
+    """
+    if isinstance(node, BNode):
+        return u'rdf:nodeID="{0}"'.format(_node_id(node))
+
+    return u'{0}={1}'.format(attribute, quoteattr(_iri(node)))
+
+
+def _xml_literal_attribute(literal):
+    """
+    Creates the attribute holding the language or datatype of a literal in
+    RDF/XML.
+
+    :param Literal literal: The literal
+    :rtype: unicode
+    :return: The attribute, or an empty string
+    """
+    if literal.language:
+        return u' xml:lang={0}'.format(quoteattr(literal.language))
+
+    if literal.datatype:
+        return u' rdf:datatype={0}'.format(quoteattr(_iri(literal.datatype)))
+
+    return u''
+
+
+def _jsonld_id(node):
+    """
+    Creates the identifier of a node in JSON-LD.
+
+    :param Any node: The URIRef or BNode
+    :rtype: unicode
+    :return: The identifier
+    """
+    if isinstance(node, BNode):
+        return u'_:' + _node_id(node)
+
+    return _iri(node)
+
+
+def _jsonld_iri(uri, prefixes):
+    """
+    Abbreviates an IRI in JSON-LD when its namespace has a prefix.
+
+    :param Any uri: The IRI
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: unicode
+    :return: The compact or full IRI
+    """
+    match = local_name.search(uri)
+
+    if match and uri[:match.start()] in prefixes:
+        return u'{0}:{1}'.format(prefixes[uri[:match.start()]], match.group())
+
+    return _iri(uri)
+
+
+def _jsonld_value(term, prefixes):
+    """
+    Creates the value object or node reference of a term in JSON-LD.
+
+    :param Any term: The URIRef, BNode or Literal
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: dict[str, unicode]
+    :return: The value object or node reference
+    """
+    if not isinstance(term, Literal):
+        return {'@id': _jsonld_id(term)}
+
+    if term.language:
+        return {'@value': unicode(term), '@language': term.language}
+
+    if term.datatype:
+        return {'@value': unicode(term),
+                '@type': _jsonld_iri(term.datatype, prefixes)}
+
+    return {'@value': unicode(term)}
+
+
+def _turtle_predicate(predicate, prefixes):
+    """
+    Abbreviates a predicate in Turtle when its namespace has a prefix.
+
+    :param Any predicate: The predicate
+    :param dict[unicode, unicode] prefixes: The prefixes of the namespaces
+    :rtype: unicode
+    :return: The predicate
+    """
+    match = local_name.search(predicate)
+
+    if match and predicate[:match.start()] in prefixes:
+        return u'{0}:{1}'.format(prefixes[predicate[:match.start()]],
+                                 match.group())
+
+    return _nt_term(predicate)
+
+
+def _nt_term(term):
+    """
+    Serializes a single term as is done in both N-Triples and Turtle.
+
+    :param Any term: The URIRef, BNode or Literal to serialize
+    :rtype: unicode
+    :return: The serialized term
+    """
+    if isinstance(term, Literal):
+        value = u'"{0}"'.format(term.translate(literal_escapes))
+
+        if term.language:
+            return u'{0}@{1}'.format(value, term.language)
+
+        if term.datatype:
+            return u'{0}^^<{1}>'.format(value, _iri(term.datatype))
+
+        return value
+
+    if isinstance(term, BNode):
+        return u'_:' + _node_id(term)
+
+    return u'<{0}>'.format(_iri(term))
+
+
+def _iri(uri):
+    """
+    Percent-encodes the characters which may not occur in an IRI, such as
+    spaces, so that a URIRef holding them is still serialized as a valid IRI.
+
+    :param Any uri: The URIRef
+    :rtype: unicode
+    :return: The valid IRI
+    """
+    return invalid_iri_characters.sub(
+        lambda match: u'%{0:02X}'.format(ord(match.group())), uri
+    )
+
+
+rdf_type = RDF.type
+local_name = re.compile(r'[A-Za-z_][A-Za-z0-9_\-]*$')
+invalid_iri_characters = re.compile(u'[\x00-\x20<>"{}|^`\\\\]')
+literal_escapes = {
+    ord(u'\\'): u'\\\\',
+    ord(u'"'): u'\\"',
+    ord(u'\n'): u'\\n',
+    ord(u'\r'): u'\\r'
+}
+writers = {
+    'xml': (xml_header, write_xml, '</rdf:RDF>\n'),
+    'n3': (turtle_header, write_turtle, ''),
+    'turtle': (turtle_header, write_turtle, ''),
+    'nt': (nt_header, write_nt, ''),
+    'json-ld': (jsonld_header, write_jsonld, '{}]}\n')
+}
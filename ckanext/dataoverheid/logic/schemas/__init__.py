@@ -0,0 +1,51 @@
+# encoding: utf-8
+
+
+from ckanext.dataoverheid.logic.helpers import profiler
+from ckanext.dataoverheid.logic.helpers.config import per_version
+
+
+def cached_schema(schema_type, build_schema):
+    """
+    Returns a package schema of the given type. The schema is only built once
+    per config version, any validators that depend on the config are therefore
+    bound to the config as it was resolved when the schema was built.
+
+    Since CKAN may modify the schemas it receives a copy of the cached schema is
+    returned, the validators themselves are shared.
+
+    :param str schema_type: The type of schema; create, update or show
+    :param function build_schema: The function which builds the schema
+    :rtype: dict[str, Any]
+    :return: The package schema
+    """
+    return _copy_schema(_build_schema(schema_type, build_schema))
+
+
+@per_version
+def _build_schema(schema_type, build_schema):
+    """
+    Builds a package schema of the given type. When profiling is enabled the
+    validators of the schema are instrumented, see `profiler.instrument()`.
+
+    :param str schema_type: The type of schema; create, update or show
+    :param function build_schema: The function which builds the schema
+    :rtype: dict[str, Any]
+    :return: The package schema
+    """
+    schema = build_schema()
+
+    return profiler.instrument(schema) if profiler.enabled() else schema
+
+
+def _copy_schema(schema):
+    """
+    Copies the dictionaries and lists of a given schema.
+
+    :param dict[str, Any] schema: The schema to copy
+    :rtype: dict[str, Any]
+    :return: The copied schema
+    """
+    return {key: _copy_schema(value) if isinstance(value, dict)
+            else list(value) if isinstance(value, list)
+            else value for key, value in schema.iteritems()}
@@ -172,9 +172,8 @@ def _mutate_schema(original_schema, default_changetype):
     temporal = tk.get_validator('temporal')
     legal_foundation = tk.get_validator('legal_foundation')
     spatial = tk.get_validator('spatial')
-    rights = tk.get_validator('rights')
     checksum = tk.get_validator('checksum')
-    date_planned = tk.get_validator('date_planned')
+    cross_field = tk.get_validator('cross_field')
 
     original_schema.update({
         'title':                    [mandatory, single_value, string],
@@ -264,7 +263,7 @@ def _mutate_schema(original_schema, default_changetype):
                                      extras],
 
         '__after':                  [contact_point, temporal, legal_foundation,
-                                     spatial, date_planned, rights]
+                                     spatial, cross_field]
     })
 
     original_schema['resources'].update({
@@ -2,10 +2,11 @@
 
 
 import ckan.plugins.toolkit as tk
-from ckanext.dataoverheid.logic.helpers.config import get_config, \
-    in_list as in_code_list
+from ckanext.dataoverheid.logic.helpers.config import get_config, get_list, \
+    per_version
 from datetime import datetime
 from dateutil import parser
+import functools
 import logging
 from urlparse import urlparse
 import re
@@ -42,6 +43,8 @@ def multi_valued(allow_duplicates=False):
     :rtype: function
     :return: A function that checks if a given value is multi valued
     """
+    string_to_list = tk.get_validator('convert_string_to_list')
+
     def multi_valued_validator(key, data, errors, context):
         """
         Checks if a given value is a list, possibly allowing duplicates. If a
@@ -55,7 +58,7 @@ def multi_valued(allow_duplicates=False):
         :param dict[Any, Any] context: Injected by CKAN core
         :rtype: None
         """
-        tk.get_validator('convert_string_to_list')(key, data, errors, context)
+        string_to_list(key, data, errors, context)
         errors[key] = [] if not errors[key] else errors[key]
 
         if not data[key]:
@@ -181,11 +184,16 @@ def uri(key, data, errors, context): # noqa
 def date(datetime_format):
     """
     Creates a function which validates datetime objects based on the given
-    datetime_format.
+    datetime_format. The date config is resolved once, when the function is
+    created.
 
     :param str datetime_format: The datetime_format to use for validation
     :rtype: function
     """
+    date_config = get_config('validation')['dates']
+    date_error = 'expected a date, or a list of dates in format {0}'\
+        .format(datetime_format)
+
     def valid_date(key, data, errors, context): # noqa
         """
         Ensures that a given value is either a datetime, or a list of datetimes.
@@ -205,38 +213,113 @@ def date(datetime_format):
         if not data[key]:
             return
 
-        date_config = get_config('validation')['dates']
         value = data[key]
         errors[key] = [] if not errors[key] else errors[key]
-        date_error = 'expected a date, or a list of dates in format {0}'\
-            .format(datetime_format)
 
         if isinstance(value, list):
-            for given_date in value:
-                try:
-                    datetime.strptime(given_date, datetime_format)
-                except ValueError:
-                    errors[key].append(date_error)
+            [errors[key].append(date_error) for given_date in value
+             if not _cached_date(given_date, datetime_format, data, context)]
 
             return
 
-        try:
-            datetime.strptime(value, datetime_format)
-        except ValueError:
-            if datetime_format != date_config['format']:
-                errors[key].append(date_error)
+        if _cached_date(value, datetime_format, data, context):
+            return
 
-                return
+        if datetime_format != date_config['format']:
+            errors[key].append(date_error)
 
-            try:
-                datetime.strptime(value, '%Y-%m-%d')
-                data[key] = value + date_config['time']
-            except ValueError:
-                errors[key].append(date_error)
+            return
+
+        parsed = _cached_date(value, '%Y-%m-%d', data, context)
+
+        if not parsed:
+            errors[key].append(date_error)
+
+            return
+
+        data[key] = value + date_config['time']
+        _parsed_dates(data, context)[(datetime_format, data[key])] = parsed
 
     return valid_date
 
 
+def parse_date(value, datetime_format):
+    """
+    Parses a given value according to the given datetime_format. The ISO
+    formats used by DCAT-AP-DONL are parsed by a fixed-format parser, all other
+    formats and any value the fixed-format parser rejects are parsed by
+    `datetime.strptime`.
+
+    Will raise a ValueError when the value does not adhere to the format.
+
+    :param str value: The value to parse
+    :param str datetime_format: The format of the value
+    :rtype: datetime
+    :return: The parsed value
+    """
+    try:
+        match = fixed_date_formats[datetime_format].match(value)
+
+        if match:
+            return datetime(*[int(group) for group in match.groups()])
+    except (KeyError, ValueError):
+        pass
+
+    return datetime.strptime(value, datetime_format)
+
+
+def _cached_date(value, datetime_format, data, context):
+    """
+    Parses a given value according to the given datetime_format, see also
+    `parse_date()`. The results are cached for the package being validated so
+    that validators which run later on the same package, such as `temporal()`,
+    do not have to parse the value again.
+
+    :param str value: The value to parse
+    :param str datetime_format: The format of the value
+    :param dict[Any, Any] data: The flattened CKAN package being validated
+    :param dict[Any, Any] context: The CKAN validation context
+    :rtype: datetime|None
+    :return: The parsed value, or None if it does not adhere to the format
+    """
+    parsed_dates = _parsed_dates(data, context)
+
+    try:
+        return parsed_dates[(datetime_format, value)]
+    except KeyError:
+        pass
+
+    try:
+        parsed = parse_date(value, datetime_format)
+    except ValueError:
+        parsed = None
+
+    parsed_dates[(datetime_format, value)] = parsed
+
+    return parsed
+
+
+def _parsed_dates(data, context):
+    """
+    Returns the parsed dates cached for the given package. The cache is kept on
+    the validation context but only holds the dates of a single package; it is
+    replaced as soon as another package is validated with the same context, so
+    that long-lived contexts, such as those of a harvester, do not accumulate
+    the dates of every package they validate.
+
+    :param dict[Any, Any] data: The flattened CKAN package being validated
+    :param dict[Any, Any] context: The CKAN validation context
+    :rtype: dict[(str, str), datetime|None]
+    :return: The parsed dates, by format and value
+    """
+    cached = context.get(parsed_dates_key)
+
+    if not cached or cached[0] is not data:
+        cached = context[parsed_dates_key] = (data, {})
+
+    return cached[1]
+
+
 def number(key, data, errors, context): # noqa
     """
     Ensures that a given value is either a number, or a list of numbers. When
@@ -302,48 +385,108 @@ def extract_communities(key, data, errors, context): # noqa
     """
     data[('communities',)] = []
     errors[('communities',)] = []
-    communities = []
     tags = []
 
     for key, value in data.iteritems():
         if len(key) == 3 and key[0] == 'tags' and key[2] == 'name':
             tags.append(value)
 
-    for community in get_config('validation')['communities']:
-        [communities.append(community['uri'])
-         for prop in community['rules'] if (prop,) in data
-         and isinstance(data[(prop,)], list)
-         and isinstance(community['rules'][prop], list)
-         and any([prop_value in community['rules'][prop]
-                  for prop_value in data.get((prop,))])]
-
-        [communities.append(community['uri'])
-         for prop in community['rules'] if (prop,) in data
-         and isinstance(data[(prop,)], basestring)
-         and isinstance(community['rules'][prop], list)
-         and data.get((prop,)) in community['rules'][prop]]
-
-        [communities.append(community['uri'])
-         for prop in community['rules'] if (prop,) in data
-         and isinstance(community['rules'][prop], bool)
-         and data.get((prop,)) == community['rules'][prop]]
-
-        try:
-            [communities.append(community['uri'])
-             for tag in tags if tag in community['tags']]
-        except KeyError:
-            pass
-
-    communities = list(set(communities))
+    communities = classify_communities(data, tags, _community_index())
+    taxonomy = get_list('DONL:Communities', 'taxonomy')
 
     for community in communities:
-        if in_code_list('DONL:Communities', 'taxonomy', community):
+        if community in taxonomy:
             logger.info('community %s added to dataset', community)
             data[('communities',)].append(community)
         else:
             logger.warning('community %s removed; not in taxonomy', community)
 
 
+def build_community_index(communities):
+    """
+    Builds an inverted index of the rules of the given communities. Each
+    community is identified by its position in the list of communities.
+
+    The index consists of:
+     - `'uris'`, the URI of each community
+     - `'values'`, the communities per (property, value) pair of list rules
+     - `'flags'`, the communities per value per property of boolean rules
+     - `'tags'`, the communities per tag
+
+    :param list of dict[str, Any] communities: The communities to index
+    :rtype: dict[str, Any]
+    :return: The index
+    """
+    index = {'uris': [], 'values': {}, 'flags': {}, 'tags': {}}
+
+    for position, community in enumerate(communities):
+        index['uris'].append(community['uri'])
+
+        for prop, rule in community['rules'].iteritems():
+            if isinstance(rule, list):
+                [index['values'].setdefault((prop, value), set()).add(position)
+                 for value in rule]
+            elif isinstance(rule, bool):
+                index['flags'].setdefault(prop, {})\
+                    .setdefault(rule, set()).add(position)
+
+        [index['tags'].setdefault(tag, set()).add(position)
+         for tag in community.get('tags', [])]
+
+    index['properties'] = set(prop for prop, value in index['values'])
+
+    return index
+
+
+def classify_communities(data, tags, index):
+    """
+    Determines the communities of a package by looking up its properties and
+    tags in an index built by `build_community_index()`.
+
+    The communities are returned in the order of the given communities, and
+    each URI only once, even when several communities share it. The linear
+    evaluation this replaces returned the same communities in an arbitrary
+    order.
+
+    :param dict[Any, Any] data: The flattened CKAN package
+    :param list of str tags: The names of the tags of the package
+    :param dict[str, Any] index: The community index
+    :rtype: list of str
+    :return: The URIs of the matching communities
+    """
+    matches = set()
+
+    for prop in index['properties']:
+        value = data.get((prop,))
+
+        if isinstance(value, basestring):
+            value = [value]
+        elif not isinstance(value, list):
+            continue
+
+        for prop_value in value:
+            try:
+                matches.update(index['values'].get((prop, prop_value), ()))
+            except TypeError:
+                continue
+
+    for prop, flags in index['flags'].iteritems():
+        try:
+            if (prop,) in data:
+                matches.update(flags.get(data[(prop,)], ()))
+        except TypeError:
+            continue
+
+    for tag in tags:
+        matches.update(index['tags'].get(tag, ()))
+
+    uris = []
+    [uris.append(index['uris'][position]) for position in sorted(matches)
+     if index['uris'][position] not in uris]
+
+    return uris
+
+
 def in_list(name, list_type):
     """
     Exposes a validation method which checks if a given value is present in the
@@ -353,10 +496,15 @@ def in_list(name, list_type):
      - vocabulary, found in `'ckanext/dataoverheid/resources/vocabularies/'`
      - taxonomy, found in `'ckanext/dataoverheid/resources/taxonomies/'`
 
+    The entries of the list are resolved once, when the function is created.
+
     :param str name: The name of the list
     :param str list_type: The type of list
     :rtype: function
     """
+    code_list = get_list(name, list_type)
+    list_error = 'value is part of the list ' + name
+
     def in_list_validator(key, data, errors, context): # noqa
         """
         Validates a given value or a list of values against a list of acceptable
@@ -371,7 +519,6 @@ def in_list(name, list_type):
         input_values = data.get(key, None)
 
         errors[key] = [] if not errors[key] else errors[key]
-        list_error = 'value is part of the list ' + name
 
         if not input_values:
             return
@@ -379,11 +526,11 @@ def in_list(name, list_type):
         if isinstance(input_values, list):
             [errors[key].append(list_error)
              for input_value in input_values
-             if not in_code_list(name, list_type, input_value)]
+             if input_value not in code_list]
 
             return
 
-        if not in_code_list(name, list_type, str(input_values)):
+        if str(input_values) not in code_list:
             errors[key].append(list_error)
 
         return
@@ -465,8 +612,13 @@ def temporal(key, data, errors, context): # noqa
     if not all(properties_present) or any(errors_present):
         return
 
-    temporal_start = parser.parse(data[('temporal_start',)])
-    temporal_end = parser.parse(data[('temporal_end',)])
+    date_format = get_config('validation')['dates']['format']
+    temporal_start = _cached_date(data[('temporal_start',)], date_format,
+                                  data, context) \
+        or parser.parse(data[('temporal_start',)])
+    temporal_end = _cached_date(data[('temporal_end',)], date_format,
+                                data, context) \
+        or parser.parse(data[('temporal_end',)])
 
     [errors[prop].append(message)
      for prop in properties if temporal_start >= temporal_end]
@@ -491,23 +643,7 @@ def date_planned(key, data, errors, context):
     :param dict[Any, Any] context: Injected by CKAN core
     :rtype: None
     """
-    properties = [
-        ('dataset_status',),
-        ('date_planned',)
-    ]
-    errors_present = (len(errors[prop]) > 0 for prop in properties)
-    affected_states = get_config('validation')['date_planned_states']
-
-    if not properties[0] in data or any(errors_present):
-        return key, data, errors, context
-
-    try:
-        data.get(properties[1])
-    except KeyError:
-        error_message = 'value is required when dataset_status is one of {0}'\
-            .format(', '.join(affected_states))
-        [errors[properties[1]].append(error_message)
-         for data[properties[0]] in affected_states]
+    evaluate_rules(_cross_field_rules('date_planned'), data, errors)
 
     return key, data, errors, context
 
@@ -591,28 +727,82 @@ def rights(key, data, errors, context):
     :param dict[Any, Any] context: Injected by CKAN core
     :rtype: None
     """
-    dataset_status = data.get(('dataset_status',), None)
-    access_rights = data.get(('access_rights',), None)
-    license = data.get(('license_id',), None)
-    validation_config = get_config('validation')
+    evaluate_rules(_cross_field_rules('rights'), data, errors)
 
-    available_uri = validation_config['available_uri']
-    public_uri = validation_config['public_uri']
+    return key, data, errors, context
 
-    status_is_available = dataset_status == available_uri
-    access_rights_public = access_rights == public_uri
-    license_is_open = license not in validation_config['non_open_licenses']
 
-    if status_is_available and access_rights_public and not license_is_open:
-        errors[('license_id',)] = [
-            'When dataset_status is set to ' + available_uri + ' and '
-            'access_rights is set to [ ' + public_uri + ' ], an open license '
-            'must be provided; got ' + license
-        ]
+def cross_field(key, data, errors, context): # noqa
+    """
+    Validates all the cross-field rules of the CKAN package in a single pass,
+    combining the `date_planned` and `rights` validators.
+
+    :param Any key: Injected by CKAN core
+    :param dict[Any, Any] data: Injected by CKAN core
+    :param dict[Any, Any] errors: Injected by CKAN core
+    :param dict[Any, Any] context: Injected by CKAN core
+    :rtype: None
+    """
+    evaluate_rules(_cross_field_rules(), data, errors)
 
     return key, data, errors, context
 
 
+def compile_rules(validation_config):
+    """
+    Compiles the cross-field rules of a given validation config. A rule is
+    violated when the value of each of its properties is contained by the
+    frozenset of violating values of that property. Each rule consists of:
+     - its name
+     - its conditions, as pairs of a property and its violating values
+     - the property on which a violation is reported
+     - a function creating the error message from the value of that property
+
+    :param dict[str, Any] validation_config: The validation config
+    :rtype: list of (str, tuple, tuple, function)
+    :return: The compiled rules
+    """
+    affected_states = validation_config['date_planned_states']
+    available_uri = validation_config['available_uri']
+    public_uri = validation_config['public_uri']
+    planned_message = 'value is required when dataset_status is one of {0}'\
+        .format(', '.join(affected_states))
+    rights_message = 'When dataset_status is set to ' + available_uri + ' ' \
+                     'and access_rights is set to [ ' + public_uri + ' ], ' \
+                     'an open license must be provided; got '
+
+    return [
+        ('date_planned', (
+            (('dataset_status',), frozenset(affected_states)),
+            (('date_planned',), frozenset([None, '']))
+        ), ('date_planned',), lambda value: planned_message),
+        ('rights', (
+            (('dataset_status',), frozenset([available_uri])),
+            (('access_rights',), frozenset([public_uri])),
+            (('license_id',),
+             frozenset(validation_config['non_open_licenses']))
+        ), ('license_id',), lambda value: rights_message + value)
+    ]
+
+
+def evaluate_rules(rules, data, errors):
+    """
+    Evaluates compiled cross-field rules against the flattened data of a CKAN
+    package, using frozenset lookups only. The evaluation of a rule stops at
+    its first condition which is not met, and a rule is skipped when any of its
+    properties already failed validation.
+
+    :param list of (str, tuple, tuple, function) rules: The compiled rules
+    :param dict[Any, Any] data: The flattened CKAN package
+    :param dict[Any, Any] errors: The errors of the flattened CKAN package
+    :rtype: None
+    """
+    for name, conditions, target, message in rules:
+        if all(not errors.get(prop) and data.get(prop) in violating_values
+               for prop, violating_values in conditions):
+            errors[target].append(message(data.get(target)))
+
+
 def spatial(key, data, errors, context): # noqa
     """
     Validates that all the given `'spatial_values'` are validate according to
@@ -651,23 +841,101 @@ def spatial(key, data, errors, context): # noqa
 
         return
 
-    spatial_config = get_config('validation')['spatial']
-    validator_mapping = {}
+    [errors[('spatial_value',)].append(message) for idx, message
+     in sorted(spatial_errors(schemes, values).iteritems())]
 
-    for scheme_uri, mapping in spatial_config.iteritems():
-        validator = mapping['validator']
 
-        try:
-            validator = validator(mapping['argument'])
-        except KeyError:
-            pass
+def spatial_errors(schemes, values):
+    """
+    Validates a list of `'spatial_value'`s against their accompanied list of
+    `'spatial_scheme'`s in a single call.
 
-        validator_mapping.update({scheme_uri: validator})
+    See also: `_spatial_registry()`.
 
+    :param list of str schemes: The spatial schemes
+    :param list of str values: The spatial values, one for each scheme
+    :rtype: dict[int, str]
+    :return: An error message for the index of each invalid value
+    """
+    registry = _spatial_registry()
     message = 'spatial_value {0} is not valid according to scheme {1}'
-    [errors[('spatial_value',)].append(message.format(val, schemes[iterator]))
-     for iterator, val in enumerate(values) if
-     not _valid_spatial(validator_mapping[schemes[iterator]], val)]
+    invalid = {}
+
+    for idx, scheme in enumerate(schemes):
+        is_valid = registry.get(scheme)
+
+        if not is_valid or not is_valid(values[idx]):
+            invalid[idx] = message.format(values[idx], scheme)
+
+    return invalid
+
+
+@per_version
+def _spatial_registry():
+    """
+    Builds a registry of all the spatial schemes defined in the
+    `'validation.spatial'` config. Each scheme is mapped to a function which
+    takes a single spatial value and returns whether or not it is valid.
+
+    Schemes validated by a regex pattern or by a list are resolved to the
+    compiled pattern or the set of list entries. Any other CKAN validator is
+    executed against a throwaway data dictionary.
+
+    :rtype: dict[str, function]
+    :return: The validation function of each scheme
+    """
+    list_types = {
+        'controlled_vocabulary': 'vocabulary',
+        'taxonomy': 'taxonomy'
+    }
+    registry = {}
+
+    for scheme, mapping in get_config('validation')['spatial'].iteritems():
+        validator = mapping['validator']
+
+        if validator in regex_validators:
+            pattern = _compiled_patterns()[regex_validators[validator]]
+            registry[scheme] = pattern.match
+        elif validator in list_types:
+            registry[scheme] = get_list(mapping['argument'],
+                                        list_types[validator]).__contains__
+        else:
+            validator = tk.get_validator(validator)
+
+            if 'argument' in mapping:
+                validator = validator(mapping['argument'])
+
+            registry[scheme] = functools.partial(_valid_spatial, validator)
+
+    return registry
+
+
+@per_version
+def _community_index():
+    """
+    Builds the community index of the communities defined in the
+    `'validation.communities'` config.
+
+    See also: `build_community_index()`.
+
+    :rtype: dict[str, Any]
+    :return: The community index
+    """
+    return build_community_index(get_config('validation')['communities'])
+
+
+@per_version
+def _cross_field_rules(*names):
+    """
+    Compiles the cross-field rules of the validation config, once per config
+    version.
+
+    :param list of str names: The names of the rules, all rules when omitted
+    :rtype: list of (str, tuple, tuple, function)
+    :return: The compiled rules
+    """
+    return [rule for rule in compile_rules(get_config('validation'))
+            if not names or rule[0] in names]
 
 
 def _valid_spatial(validation_method, value):
@@ -699,7 +967,7 @@ def epsg28992(key, data, errors, context): # noqa
     if key not in data:
         return
 
-    pattern = get_config('validation')['regex']['epsg28992']
+    pattern = _compiled_patterns()['epsg28992']
     error_message = 'value is not a valid Overheid:PostcodeHuisnummer'
     errors[key] = [] if not errors[key] else errors[key]
     _regex_match(key, data[key], pattern, errors, error_message)
@@ -719,7 +987,7 @@ def postcode_huisnummer(key, data, errors, context): # noqa
     if key not in data:
         return
 
-    pattern = get_config('validation')['regex']['postcodeHuisnummer']
+    pattern = _compiled_patterns()['postcodeHuisnummer']
     error_message = 'value is not a valid Overheid:PostcodeHuisnummer'
     errors[key] = [] if not errors[key] else errors[key]
     _regex_match(key, data[key], pattern, errors, error_message)
@@ -731,7 +999,7 @@ def _regex_match(key, value, pattern, errors, error_message):
 
     :param Any key: The name of the value
     :param str|list of str value: The value itself
-    :param str pattern: The pattern the value must match
+    :param re.RegexObject pattern: The compiled pattern the value must match
     :param dict[Any, Any] errors: The error dictionary of CKAN
     :param str error_message: The error message should the value not match the
                               pattern
@@ -739,9 +1007,33 @@ def _regex_match(key, value, pattern, errors, error_message):
     """
     if isinstance(value, list):
         [errors[key].append(error_message) for val in value
-         if not re.match(pattern, val)]
+         if not pattern.match(val)]
 
         return
 
-    if not re.match(pattern, value):
+    if not pattern.match(value):
         errors[key].append(error_message)
+
+
+@per_version
+def _compiled_patterns():
+    """
+    Compiles the regex patterns defined in the `'validation.regex'` config.
+
+    :rtype: dict[str, re.RegexObject]
+    :return: The compiled patterns, by name
+    """
+    return {name: re.compile(pattern) for name, pattern
+            in get_config('validation')['regex'].iteritems()}
+
+
+fixed_date_formats = {
+    '%Y-%m-%dT%H:%M:%S': re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):'
+                                    r'(\d{2})\Z'),
+    '%Y-%m-%d': re.compile(r'(\d{4})-(\d{2})-(\d{2})\Z')
+}
+parsed_dates_key = 'ckanext.dataoverheid.parsed_dates'
+regex_validators = {
+    'epsg_28992': 'epsg28992',
+    'postcode_huisnummer': 'postcodeHuisnummer'
+}
@@ -2,22 +2,32 @@
 
 
 from ckan.common import config
+import ckan.model as model
 import ckan.plugins as plugins
 import ckan.plugins.toolkit as tk
 import ckanext.dataoverheid.logic.converters as converters
 import ckanext.dataoverheid.logic.validators as validators
 import ckanext.dataoverheid.logic.helpers.transformers as transformers
+import ckanext.dataoverheid.logic.schemas as schemas
+import ckanext.dataoverheid.logic.rdf.cache as rdf_cache
+import ckanext.dataoverheid.logic.rdf.catalog as rdf_catalog
+from ckanext.dataoverheid.logic.helpers import profiler
 from ckanext.dataoverheid.logic.schemas import dcat_ap_donl, dataoverheid
-from ckanext.dataoverheid.logic.actions import catalog_as_rdf, package_as_rdf
+from ckanext.dataoverheid.logic.actions import catalog_as_rdf, \
+    catalog_cache_statistics, package_as_rdf, package_validate_many, \
+    validation_profile_show
 from ckanext.dataoverheid.logic.helpers.queries import wildcard_search
 from ckanext.dataoverheid.logic.authorizations import \
-    dataset_purge_authorization
+    catalog_cache_statistics_authorization, dataset_purge_authorization, \
+    package_validate_many_authorization, validation_profile_show_authorization
 
 
 class SchemaPlugin(plugins.SingletonPlugin, tk.DefaultDatasetForm):
     plugins.implements(plugins.IValidators)
     plugins.implements(plugins.IDatasetForm)
     plugins.implements(plugins.IPackageController, inherit=True)
+    plugins.implements(plugins.IActions)
+    plugins.implements(plugins.IAuthFunctions)
 
     # IValidators
 
@@ -42,6 +52,7 @@ class SchemaPlugin(plugins.SingletonPlugin, tk.DefaultDatasetForm):
             'legal_foundation': validators.legal_foundation,
             'checksum': validators.checksum,
             'rights': validators.rights,
+            'cross_field': validators.cross_field,
             'spatial': validators.spatial,
             'epsg_28992': validators.epsg28992,
             'postcode_huisnummer': validators.postcode_huisnummer
@@ -58,26 +69,51 @@ class SchemaPlugin(plugins.SingletonPlugin, tk.DefaultDatasetForm):
                                     []))
 
     def create_package_schema(self):
+        return schemas.cached_schema('create', self._create_package_schema)
+
+    def update_package_schema(self):
+        return schemas.cached_schema('update', self._update_package_schema)
+
+    def show_package_schema(self):
+        return schemas.cached_schema('show', self._show_package_schema)
+
+    def _create_package_schema(self):
         schema = super(SchemaPlugin, self).create_package_schema()
         schema = dcat_ap_donl.create_schema(schema)
         schema = dataoverheid.create_schema(schema)
 
         return schema
 
-    def update_package_schema(self):
+    def _update_package_schema(self):
         schema = super(SchemaPlugin, self).update_package_schema()
         schema = dcat_ap_donl.update_schema(schema)
         schema = dataoverheid.update_schema(schema)
 
         return schema
 
-    def show_package_schema(self):
+    def _show_package_schema(self):
         schema = super(SchemaPlugin, self).show_package_schema()
         schema = dcat_ap_donl.show_schema(schema)
         schema = dataoverheid.show_schema(schema)
 
         return schema
 
+    # IActions
+
+    def get_actions(self): # noqa
+        return {
+            'package_validate_many': package_validate_many,
+            'validation_profile_show': validation_profile_show
+        }
+
+    # IAuthFunctions
+
+    def get_auth_functions(self): # noqa
+        return {
+            'package_validate_many': package_validate_many_authorization,
+            'validation_profile_show': validation_profile_show_authorization
+        }
+
     # IPackageController
 
     def before_index(self, data_dict): # noqa
@@ -86,24 +122,49 @@ class SchemaPlugin(plugins.SingletonPlugin, tk.DefaultDatasetForm):
     def after_show(self, context, data_dict): # noqa
         return context, transformers.remove_properties(data_dict)
 
+    def after_create(self, context, data_dict): # noqa
+        profiler.log_summary('package_create')
+
+    def after_update(self, context, data_dict): # noqa
+        profiler.log_summary('package_update')
+
 
 class RDFPlugin(plugins.SingletonPlugin):
+    plugins.implements(plugins.interfaces.IConfigurable, inherit=True)
     plugins.implements(plugins.interfaces.IActions, inherit=True)
     plugins.implements(plugins.interfaces.IRoutes, inherit=True)
+    plugins.implements(plugins.interfaces.IAuthFunctions, inherit=True)
+    plugins.implements(plugins.interfaces.IDomainObjectModification,
+                       inherit=True)
+
+    # IConfigurable
+
+    def configure(self, config): # noqa
+        rdf_cache.listen()
+        rdf_catalog.listen()
 
     # IActions
 
     def get_actions(self): # noqa
         return {
             'rdf_catalog_show': catalog_as_rdf,
+            'rdf_catalog_cache_statistics': catalog_cache_statistics,
             'rdf_package_show': package_as_rdf
         }
 
+    # IAuthFunctions
+
+    def get_auth_functions(self): # noqa
+        return {
+            'rdf_catalog_cache_statistics':
+                catalog_cache_statistics_authorization
+        }
+
     # IRoutes
 
     def before_map(self, _map): # noqa
         controller = 'ckanext.dataoverheid.logic.controllers:RDFController'
-        output_requirements = {'output': 'xml|rdf|ttl|n3'}
+        output_requirements = {'output': 'xml|rdf|ttl|n3|nt|jsonld'}
 
         _map.connect('rdf_catalog', '/catalog.{output}', controller=controller,
                      action='catalog_as_rdf', requirements=output_requirements)
@@ -120,6 +181,14 @@ class RDFPlugin(plugins.SingletonPlugin):
 
         return _map
 
+    # IDomainObjectModification
+
+    def notify(self, entity, operation): # noqa
+        if isinstance(entity, model.Package):
+            removed = operation == model.DomainObjectOperation.deleted
+            rdf_cache.schedule_package(entity, removed)
+            rdf_catalog.schedule_package(entity, removed)
+
 
 class InterfacePlugin(plugins.SingletonPlugin):
     plugins.implements(plugins.IConfigurer)
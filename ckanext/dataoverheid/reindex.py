@@ -0,0 +1,201 @@
+# encoding: utf-8
+
+
+import logging
+import multiprocessing
+import timeit
+import ckan.model as model
+import ckan.lib.search.index as search_index
+import ckan.plugins.toolkit as tk
+from ckan.lib.search.common import make_connection
+from ckan.lib.search.index import PACKAGE_TYPE, TYPE_FIELD
+from ckanext.dataoverheid.logic.helpers.queries import package_id_batches
+
+
+logger = logging.getLogger('ckanext-dataoverheid')
+
+
+def run(batch_size, processes, report):
+    """
+    Rebuilds the Solr index of all packages which are not deleted. The package
+    ids are streamed from the database in batches, while a pool of processes
+    creates the Solr documents of each batch through the indexing of CKAN
+    itself, including the `before_index` transformation of this extension.
+    The documents of a batch are posted to Solr while the next batch is being
+    processed.
+
+    Afterwards the documents of this site whose package was purged or deleted
+    are removed from the index, after which all changes are committed at once.
+
+    :param int batch_size: The amount of packages to post to Solr at once
+    :param int processes: The amount of processes creating Solr documents
+    :param function report: Called with the amount of packages indexed and
+                            the amount of seconds passed after every batch
+    :rtype: (int, int, int, float)
+    :return: The amount of packages indexed, removed from the index and
+             failed, and the seconds passed
+    """
+    connection = make_connection()
+    chunk_size = max(1, batch_size // (processes * 4))
+    progress = {'indexed': 0, 'removed': 0, 'failed': 0}
+    start = timeit.default_timer()
+
+    # The pool is forked without any database connections to inherit.
+    model.Session.remove()
+    model.meta.engine.dispose()
+    pool = multiprocessing.Pool(processes, _init_process)
+
+    def post(pending):
+        for documents, deletions, failed in pending.get():
+            if documents:
+                connection.add(docs=documents, commit=False)
+
+            [connection.delete(q=query, commit=False) for query in deletions]
+            progress['indexed'] += len(documents)
+            progress['removed'] += len(deletions)
+            progress['failed'] += failed
+
+        report(progress['indexed'], timeit.default_timer() - start)
+
+    try:
+        pending = None
+
+        for package_ids in package_id_batches(_package_query(), batch_size):
+            chunks = [package_ids[idx:idx + chunk_size]
+                      for idx in xrange(0, len(package_ids), chunk_size)]
+            processing = pool.map_async(_create_documents, chunks)
+
+            if pending:
+                post(pending)
+
+            pending = processing
+
+        if pending:
+            post(pending)
+    finally:
+        pool.close()
+        pool.join()
+
+    progress['removed'] += _remove_stale_documents(connection, batch_size)
+    connection.commit(waitSearcher=False)
+
+    return progress['indexed'], progress['removed'], progress['failed'], \
+        timeit.default_timer() - start
+
+
+def _package_query():
+    """
+    Creates the query for the ids of all packages which are not deleted.
+
+    :rtype: Query
+    :return: The query
+    """
+    return model.Session.query(model.Package.id)\
+        .filter(model.Package.state != model.State.DELETED)
+
+
+def _remove_stale_documents(connection, batch_size):
+    """
+    Removes the Solr documents of this site whose package no longer exists or
+    was deleted, such as those of packages purged while Solr was unavailable.
+    The documents are visited in batches with a Solr cursor, and each batch is
+    checked against the database. The removals are not committed.
+
+    :param pysolr.Solr connection: The Solr connection
+    :param int batch_size: The amount of documents to check at once
+    :rtype: int
+    :return: The amount of documents removed
+    """
+    query = '+{0}:{1} +site_id:"{2}"'.format(TYPE_FIELD, PACKAGE_TYPE,
+                                             tk.config.get('ckan.site_id'))
+    cursor = '*'
+    removed = 0
+
+    while True:
+        results = connection.search(query, fl='id,index_id', rows=batch_size,
+                                    sort='index_id asc', cursorMark=cursor)
+        package_ids = [document['id'] for document in results.docs]
+        existing = frozenset(
+            row[0] for row in _package_query()
+            .filter(model.Package.id.in_(package_ids))
+        ) if package_ids else frozenset()
+        model.Session.remove()
+
+        stale = [document['index_id'] for document in results.docs
+                 if document['id'] not in existing]
+        [connection.delete(id=index_id, commit=False) for index_id in stale]
+        removed += len(stale)
+
+        if not results.docs or results.nextCursorMark == cursor:
+            return removed
+
+        cursor = results.nextCursorMark
+
+
+def _init_process():
+    """
+    Prepares a forked process for creating Solr documents. The Solr connection
+    used by the indexing of CKAN is replaced by a collector of the documents,
+    which are returned to the main process instead.
+
+    :rtype: None
+    """
+    search_index.make_connection = lambda *args, **kwargs: _collector
+
+
+def _create_documents(package_ids):
+    """
+    Creates the Solr documents of the given packages.
+
+    :param list of str package_ids: The ids of the packages
+    :rtype: (list of dict[str, Any], list of str, int)
+    :return: The Solr documents, the deletion queries and the amount of
+             packages that could not be indexed
+    """
+    context = {
+        'model': model,
+        'ignore_auth': True,
+        'validate': False,
+        'use_cache': False
+    }
+    package_index = search_index.PackageSearchIndex()
+    package_show = tk.get_action('package_show')
+    _collector.documents = []
+    _collector.deletions = []
+    failed = 0
+
+    for package_id in package_ids:
+        try:
+            package_index.update_dict(package_show(dict(context),
+                                                   {'id': package_id}), True)
+        except Exception as e:
+            logger.warning('unable to index package %s: %s', package_id, e)
+            failed += 1
+
+    model.Session.remove()
+
+    return _collector.documents, _collector.deletions, failed
+
+
+class _DocumentCollector(object):
+    """
+    Stands in for the Solr connection of the indexing of CKAN within the
+    forked processes, collecting the documents and deletions it receives.
+    """
+    url = 'collector'
+
+    def __init__(self):
+        self.documents = []
+        self.deletions = []
+
+    def add(self, docs, commit=False, **kwargs):
+        self.documents.extend(docs)
+
+    def delete(self, q=None, commit=False, **kwargs):
+        self.deletions.append(q)
+
+    def commit(self, **kwargs):
+        pass
+
+
+_collector = _DocumentCollector()
@@ -0,0 +1,36 @@
+# encoding: utf-8
+
+
+import json
+import os
+import time
+import uuid
+import fakeredis
+from ckanext.dataoverheid.logic.helpers import config
+
+
+def use_fake_redis():
+    """
+    Replaces the Redis connection of the current process by an empty fake
+    Redis server, and replaces the config snapshot by the sections of the
+    `config.json` of this extension. The snapshot gets a version stamp of its
+    own, so that nothing derived from the config by an earlier test is reused.
+
+    :rtype: fakeredis.FakeRedis
+    :return: The fake Redis connection
+    """
+    filepath = os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                            'config.json')
+
+    with open(filepath, 'r') as config_file:
+        contents = json.load(config_file)
+
+    connection = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    config._redis.update(pid=os.getpid(), connection=connection, calls=0)
+    config._snapshot.update(checked_at=time.time(), current={
+        'version': uuid.uuid4().hex,
+        'config': {section: contents[section]
+                   for section in config.config_sections}
+    })
+
+    return connection
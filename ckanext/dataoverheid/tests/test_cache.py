@@ -0,0 +1,181 @@
+# encoding: utf-8
+
+
+import mock
+from collections import namedtuple
+from datetime import datetime
+from ckanext.dataoverheid.logic.helpers import config
+from ckanext.dataoverheid.logic.rdf import cache
+from ckanext.dataoverheid.tests.helpers import use_fake_redis
+
+
+class TestPackageCache(object):
+    """
+    Verifies that the per-process cache of package serializations only serves
+    the serialization of the current version of a public package, in the
+    requested format and for the current config version, and that it keeps
+    within its limits.
+    """
+    def setup(self):
+        use_fake_redis()
+        cache._entries.clear()
+        cache._usage['bytes'] = 0
+
+    def test_hit_by_id_and_name(self):
+        cache.put_package(_package(), 'xml', 'serialization')
+
+        assert cache.get_package('id-1', 'xml') == 'serialization'
+        assert cache.get_package('name-1', 'xml') == 'serialization'
+
+    def test_keyed_on_output_and_config_version(self):
+        cache.put_package(_package(), 'xml', 'serialization')
+
+        assert cache.get_package('id-1', 'turtle') is None
+
+        config._snapshot['current']['version'] = 'another version'
+
+        assert cache.get_package('id-1', 'xml') is None
+
+    def test_unknown_package_misses(self):
+        assert cache.get_package('id-1', 'xml') is None
+        assert cache.get_package(None, 'xml') is None
+
+    def test_private_and_inactive_packages_are_never_cached(self):
+        cache.put_package(_package(private=True), 'xml', 'private')
+        cache.put_package(_package(id='id-2', name='name-2', state='deleted'),
+                          'xml', 'deleted')
+        cache.put_package(_package(id='id-3', name='name-3', state='draft'),
+                          'xml', 'draft')
+
+        assert not cache._entries
+        assert all(cache.get_package(package_id, 'xml') is None
+                   for package_id in ['id-1', 'name-1', 'id-2', 'id-3'])
+
+    def test_modification_invalidates(self):
+        cache.put_package(_package(), 'xml', 'before')
+        _commit(Package('id-1', 'name-1', datetime(2020, 2, 1)))
+
+        assert cache.get_package('id-1', 'xml') is None
+        assert cache.get_package('name-1', 'xml') is None
+
+        cache.put_package(_package(metadata_modified='2020-02-01T00:00:00'),
+                          'xml', 'after')
+
+        assert cache.get_package('id-1', 'xml') == 'after'
+
+    def test_outdated_serialization_is_never_served(self):
+        _commit(Package('id-1', 'name-1', datetime(2020, 2, 1)))
+        cache.put_package(_package(), 'xml', 'before')
+
+        assert cache.get_package('id-1', 'xml') is None
+
+    def test_rolled_back_modification_is_discarded(self):
+        session = _schedule(Package('id-1', 'name-1', datetime(2020, 2, 1)))
+        cache._discard_scheduled(session)
+        cache._apply_scheduled(session)
+        cache.put_package(_package(), 'xml', 'serialization')
+
+        assert cache.get_package('id-1', 'xml') == 'serialization'
+
+    def test_rename_invalidates_the_old_name(self):
+        cache.put_package(_package(), 'xml', 'serialization')
+        _commit(Package('id-1', 'name-2', datetime(2020, 1, 1)))
+
+        assert cache.get_package('name-1', 'xml') is None
+        assert cache.get_package('name-2', 'xml') == 'serialization'
+        assert cache.get_package('id-1', 'xml') == 'serialization'
+
+    def test_purged_package_misses(self):
+        cache.put_package(_package(), 'xml', 'serialization')
+        _commit(Package('id-1', 'name-1', datetime(2020, 1, 1)), True)
+        cache.put_package(_package(), 'xml', 'serialization')
+
+        assert cache.get_package('id-1', 'xml') is None
+        assert cache.get_package('name-1', 'xml') is None
+
+    def test_evicts_least_recently_used_entries(self):
+        with _limits(2, 1024):
+            [cache.put_package(_package(id='id-' + idx, name='name-' + idx),
+                               'xml', 'serialization ' + idx)
+             for idx in ['1', '2']]
+            cache.get_package('id-1', 'xml')
+            cache.put_package(_package(id='id-3', name='name-3'), 'xml',
+                              'serialization 3')
+
+            assert cache.get_package('id-1', 'xml') == 'serialization 1'
+            assert cache.get_package('id-2', 'xml') is None
+            assert cache.get_package('id-3', 'xml') == 'serialization 3'
+
+    def test_evicts_entries_over_the_size_limit(self):
+        with _limits(10, 10):
+            cache.put_package(_package(), 'xml', 'x' * 6)
+            cache.put_package(_package(), 'turtle', 'y' * 6)
+
+            assert cache.get_package('id-1', 'xml') is None
+            assert cache.get_package('id-1', 'turtle') == 'y' * 6
+            assert cache._usage['bytes'] == 6
+
+            cache.put_package(_package(), 'nt', 'z' * 11)
+
+            assert cache.get_package('id-1', 'nt') is None
+            assert cache.get_package('id-1', 'turtle') == 'y' * 6
+
+    def test_disabled_without_entries(self):
+        with _limits(0, 1024):
+            cache.put_package(_package(), 'xml', 'serialization')
+
+            assert not cache._entries
+            assert cache.get_package('id-1', 'xml') is None
+
+
+def _package(**properties):
+    """
+    Creates the dictionary of a public, active package as shown by CKAN.
+
+    :rtype: dict[str, Any]
+    :return: The package
+    """
+    package = {'id': 'id-1', 'name': 'name-1', 'state': 'active',
+               'private': False, 'metadata_modified': '2020-01-01T00:00:00'}
+    package.update(properties)
+
+    return package
+
+
+def _schedule(package, removed=False):
+    """
+    Schedules the invalidation of a package within a fake database session.
+
+    :rtype: mock.Mock
+    :return: The database session
+    """
+    session = mock.Mock(info={})
+
+    with mock.patch.object(cache.model, 'Session', return_value=session):
+        cache.schedule_package(package, removed)
+
+    return session
+
+
+def _commit(package, removed=False):
+    """
+    Schedules the invalidation of a package and commits it.
+
+    :rtype: None
+    """
+    cache._apply_scheduled(_schedule(package, removed))
+
+
+def _limits(max_entries, max_bytes):
+    """
+    Overrides the limits of the cache.
+
+    :rtype: context manager
+    """
+    return mock.patch.dict(cache.ckan_config, {
+        'ckan.ckanext-dataoverheid.rdf_cache_entries': max_entries,
+        'ckan.ckanext-dataoverheid.rdf_cache_bytes': max_bytes
+    })
+
+
+Package = namedtuple('Package', ['id', 'name', 'metadata_modified'])
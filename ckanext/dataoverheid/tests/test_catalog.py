@@ -0,0 +1,227 @@
+# encoding: utf-8
+
+
+import mock
+from ckanext.dataoverheid.logic.helpers.config import get_config
+from ckanext.dataoverheid.logic.rdf import catalog
+from ckanext.dataoverheid.tests.helpers import use_fake_redis
+from rdflib import Graph, Namespace, URIRef
+from sqlalchemy import Boolean, Column, Text, create_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+
+class TestCatalog(object):
+    """
+    Verifies that the catalog lists exactly the active, public packages which
+    were committed, and that it is only assembled within a request when it was
+    never assembled before.
+    """
+    def setup(self):
+        self.redis = use_fake_redis()
+        self.session = _database(['id-1', 'id-2', 'id-3'])
+        self.patcher = mock.patch.object(catalog, 'model', mock.Mock(
+            Package=Package, State=State, Session=self.session
+        ))
+        self.patcher.start()
+        catalog.listen()
+
+    def teardown(self):
+        self.patcher.stop()
+        self.session.remove()
+
+    def test_rebuild_lists_active_public_packages(self):
+        catalog.rebuild()
+
+        for output in catalog.formats():
+            assert sorted(self.redis.hkeys(catalog.fragments_key + output)) \
+                == ['id-1', 'id-2', 'id-3']
+
+        assert self.redis.get(catalog.config_version_key) == \
+            catalog.dcat_version()
+
+    def test_miss_then_hit(self):
+        serialization, status = catalog.read('xml')
+
+        assert status == 'miss'
+        assert _datasets(serialization) == ['name-1', 'name-2', 'name-3']
+        assert not self.redis.exists(catalog.lock_key + 'xml')
+        assert catalog.read('xml') == (serialization, 'hit')
+
+    def test_stale_until_refreshed(self):
+        serialization, _ = catalog.read('xml')
+        package = Package(id='id-4', name='name-4', state='active',
+                          private=False)
+        self.session.add(package)
+        catalog.schedule_package(package)
+        self.session.commit()
+
+        with mock.patch.object(catalog.tk, 'enqueue_job') as enqueue_job:
+            assert catalog.read('xml') == (serialization, 'stale')
+            assert catalog.read('xml') == (serialization, 'stale')
+            assert enqueue_job.call_count == 1
+
+        job, arguments = enqueue_job.call_args[0]
+        job(*arguments)
+        serialization, status = catalog.read('xml')
+
+        assert status == 'hit'
+        assert _datasets(serialization) == ['name-1', 'name-2', 'name-3',
+                                            'name-4']
+        assert not self.redis.exists(catalog.lock_key + 'xml')
+
+    def test_committed_changes_are_applied(self):
+        catalog.rebuild()
+        self.session.add(Package(id='id-4', name='name-4', state='active',
+                                 private=False))
+        self.session.query(Package).filter(Package.id == 'id-1')\
+            .update({'private': True})
+        [catalog.schedule_package(package)
+         for package in self.session.query(Package).all()]
+        self.session.commit()
+
+        assert sorted(self.redis.hkeys(catalog.fragments_key + 'xml')) == \
+            ['id-2', 'id-3', 'id-4']
+        assert _datasets(catalog.read('xml')[0]) == ['name-2', 'name-3',
+                                                     'name-4']
+
+    def test_rolled_back_changes_are_discarded(self):
+        catalog.rebuild()
+        package = Package(id='id-4', name='name-4', state='active',
+                          private=False)
+        self.session.add(package)
+        self.session.flush()
+        catalog.schedule_package(package)
+        self.session.rollback()
+        self.session.commit()
+
+        assert sorted(self.redis.hkeys(catalog.fragments_key + 'xml')) == \
+            ['id-1', 'id-2', 'id-3']
+
+
+class TestCatalogPages(object):
+    """
+    Verifies that the pages of the catalog are keyed by the id of the last
+    dataset of the previous page, and that they link to each other as a Hydra
+    PagedCollection.
+    """
+    def setup(self):
+        use_fake_redis()
+        self.session = _database(['id-{0}'.format(idx)
+                                  for idx in range(1, 6)])
+        self.patchers = [
+            mock.patch.object(catalog, 'model', mock.Mock(
+                Package=Package, State=State, Session=self.session
+            )),
+            mock.patch.dict(catalog.ckan_config, {
+                'ckan.ckanext-dataoverheid.catalog_page_size': 2
+            })
+        ]
+        [patcher.start() for patcher in self.patchers]
+
+    def teardown(self):
+        [patcher.stop() for patcher in self.patchers]
+        self.session.remove()
+
+    def test_first_page(self):
+        self._assert_page(None, ['name-1', 'name-2'], {
+            'firstPage': 'page=1', 'nextPage': 'after=id-2',
+            'lastPage': 'after=id-3'
+        })
+
+    def test_middle_page(self):
+        self._assert_page('id-2', ['name-3', 'name-4'], {
+            'firstPage': 'page=1', 'previousPage': 'page=1',
+            'nextPage': 'after=id-4', 'lastPage': 'after=id-3'
+        })
+
+    def test_last_page(self):
+        self._assert_page('id-4', ['name-5'], {
+            'firstPage': 'page=1', 'previousPage': 'after=id-2',
+            'lastPage': 'after=id-3'
+        })
+
+    def test_no_datasets_after_the_last_one(self):
+        try:
+            catalog.read_page('xml', 'id-5', url)
+        except catalog.tk.ObjectNotFound:
+            return
+
+        raise AssertionError('ObjectNotFound was not raised')
+
+    def _assert_page(self, after, names, links):
+        serialization = ''.join(catalog.read_page('xml', after, url))
+        graph = Graph().parse(data=serialization, format='xml')
+        page = URIRef('{0}?{1}'.format(
+            url, 'after={0}'.format(after) if after else 'page=1'
+        ))
+
+        assert _datasets(serialization) == names
+        assert graph.value(page, hydra.itemsPerPage).toPython() == 2
+        assert {link: str(graph.value(page, hydra[link]))
+                for link in ['firstPage', 'previousPage', 'nextPage',
+                             'lastPage']
+                if graph.value(page, hydra[link])} == \
+            {link: '{0}?{1}'.format(url, query)
+             for link, query in links.iteritems()}
+
+
+def _database(package_ids):
+    """
+    Creates an in-memory database holding an active, public package for each
+    of the given ids, followed by a private and a deleted package.
+
+    :param list of str package_ids: The ids of the packages
+    :rtype: scoped_session
+    :return: The database session
+    """
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = scoped_session(sessionmaker(bind=engine))
+    [session.add(Package(id=package_id, name=package_id.replace('id', 'name'),
+                         state='active', private=False))
+     for package_id in package_ids]
+    session.add(Package(id='id-private', name='name-private', state='active',
+                        private=True))
+    session.add(Package(id='id-deleted', name='name-deleted', state='deleted',
+                        private=False))
+    session.commit()
+
+    return session
+
+
+def _datasets(serialization):
+    """
+    Lists the names of the datasets of a serialized catalog.
+
+    :param str serialization: The catalog serialized as RDF/XML
+    :rtype: list of str
+    :return: The names of the datasets
+    """
+    graph = Graph().parse(data=serialization, format='xml')
+    identifier = get_config('dcat')['templates']['identifier']
+    prefix, suffix = identifier.split('{0}')
+
+    return sorted(str(dataset)[len(prefix):len(str(dataset)) - len(suffix)]
+                  for dataset in graph.objects(None, dcat.dataset))
+
+
+Base = declarative_base()
+
+
+class Package(Base):
+    """
+    The columns of the CKAN package table queried by the catalog.
+    """
+    __tablename__ = 'package'
+
+    id = Column(Text, primary_key=True)
+    name = Column(Text)
+    state = Column(Text)
+    private = Column(Boolean)
+
+
+State = mock.Mock(ACTIVE='active', DELETED='deleted')
+dcat = Namespace('http://www.w3.org/ns/dcat#')
+hydra = Namespace('http://www.w3.org/ns/hydra/core#')
+url = 'https://data.overheid.nl/catalog.xml'
@@ -0,0 +1,101 @@
+# encoding: utf-8
+
+
+from datetime import datetime
+from ckanext.dataoverheid.logic.helpers import config, transformers
+from ckanext.dataoverheid.tests.helpers import use_fake_redis
+
+
+class TestTransformMultivaluedProperties(object):
+    """
+    Verifies that the package and every one of its resources are transformed
+    according to the `'transformations'` config.
+    """
+    def setup(self):
+        use_fake_redis()
+
+    def test_package_lists_are_split(self):
+        data_dict = {'language': '{nl,en}', 'theme': '{a}', 'source': ['b']}
+        transformers.transform_multivalued_properties(data_dict)
+
+        assert data_dict == {'language': ['nl', 'en'], 'theme': ['a'],
+                             'source': ['b']}
+
+    def test_resource_lists_are_only_stripped(self):
+        data_dict = {'resources': [{'language': '{nl,en}'}]}
+        transformers.transform_multivalued_properties(data_dict)
+
+        assert data_dict['resources'][0]['language'] == 'nl,en'
+
+    def test_dates_are_suffixed(self):
+        data_dict = {'issued': '2020-01-01T00:00:00',
+                     'modified': datetime(2020, 1, 2),
+                     'resources': [{'release_date': '2020-01-03T00:00:00'}]}
+        transformers.transform_multivalued_properties(data_dict)
+
+        assert data_dict['issued'] == '2020-01-01T00:00:00Z'
+        assert data_dict['modified'] == '2020-01-02 00:00:00Z'
+        assert data_dict['resources'][0]['release_date'] == \
+            '2020-01-03T00:00:00Z'
+
+    def test_missing_dates_are_skipped(self):
+        data_dict = {'issued': None,
+                     'resources': [{'release_date': None}]}
+        transformers.transform_multivalued_properties(data_dict)
+
+        assert data_dict == {'issued': None,
+                             'resources': [{'release_date': None}]}
+
+    def test_every_resource_is_transformed(self):
+        data_dict = {'resources': [{'language': '{nl}',
+                                    'release_date': '2020-01-01T00:00:00'}
+                                   for _ in range(3)]}
+        transformers.transform_multivalued_properties(data_dict)
+
+        assert data_dict['resources'] == [
+            {'language': 'nl', 'release_date': '2020-01-01T00:00:00Z'}
+        ] * 3
+
+
+class TestRemoveProperties(object):
+    """
+    Verifies that the properties listed in the `'properties_to_remove'` config
+    are removed from the package and the items it contains.
+    """
+    def setup(self):
+        use_fake_redis()
+        self.properties = config.get_config('properties_to_remove')
+
+    def test_package_properties_are_removed(self):
+        data_dict = dict((prop, 'value')
+                         for prop in self.properties['package'])
+        data_dict['title'] = 'title'
+        transformers.remove_properties(data_dict)
+
+        assert data_dict == {'title': 'title'}
+
+    def test_organization_and_item_properties_are_removed(self):
+        self.properties.update(organization=['created'], tag=['state'],
+                               resource=['cache_url'], group=[])
+        data_dict = {
+            'organization': {'created': 'created', 'title': 'title'},
+            'tags': [{'state': 'active', 'name': 'tag'}],
+            'resources': [{'cache_url': 'url', 'url': 'url'}
+                          for _ in range(2)],
+            'groups': [{'state': 'active'}]
+        }
+        transformers.remove_properties(data_dict)
+
+        assert data_dict == {
+            'organization': {'title': 'title'},
+            'tags': [{'name': 'tag'}],
+            'resources': [{'url': 'url'}] * 2,
+            'groups': [{'state': 'active'}]
+        }
+
+    def test_missing_organization_and_items_are_skipped(self):
+        self.properties.update(organization=['created'], tag=['state'])
+        data_dict = {'organization': None, 'tags': None}
+        transformers.remove_properties(data_dict)
+
+        assert data_dict == {'organization': None, 'tags': None}
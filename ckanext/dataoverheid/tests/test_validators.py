@@ -0,0 +1,152 @@
+# encoding: utf-8
+
+
+import json
+import os
+from collections import defaultdict
+from ckanext.dataoverheid.logic import validators
+
+
+class TestCrossFieldRules(object):
+    """
+    Pins the behaviour of the compiled `date_planned` and `rights` rules. Unlike
+    the validators they replaced, `date_planned` is enforced and the `rights`
+    error is appended to the errors of `license_id`, so packages which used to
+    be accepted are now rejected.
+    """
+    def setup(self):
+        self.config = _validation_config()
+        self.rules = validators.compile_rules(self.config)
+        self.errors = defaultdict(list)
+
+    def test_date_planned_required_for_planned_states(self):
+        for status in self.config['date_planned_states']:
+            for date_planned in [None, '']:
+                errors = defaultdict(list)
+                data = {('dataset_status',): status}
+
+                if date_planned is not None:
+                    data[('date_planned',)] = date_planned
+
+                validators.evaluate_rules(self.rules, data, errors)
+
+                assert errors[('date_planned',)] == [
+                    'value is required when dataset_status is one of {0}'
+                    .format(', '.join(self.config['date_planned_states']))
+                ]
+
+    def test_date_planned_given_for_planned_state(self):
+        data = {
+            ('dataset_status',): self.config['date_planned_states'][0],
+            ('date_planned',): '2020-01-01T00:00:00'
+        }
+        validators.evaluate_rules(self.rules, data, self.errors)
+
+        assert not self.errors[('date_planned',)]
+
+    def test_date_planned_optional_for_other_states(self):
+        data = {('dataset_status',): self.config['available_uri']}
+        validators.evaluate_rules(self.rules, data, self.errors)
+
+        assert not self.errors[('date_planned',)]
+
+    def test_date_planned_skipped_on_earlier_errors(self):
+        data = {('dataset_status',): self.config['date_planned_states'][0]}
+        self.errors[('dataset_status',)].append('earlier error')
+        validators.evaluate_rules(self.rules, data, self.errors)
+
+        assert not self.errors[('date_planned',)]
+
+    def test_rights_require_open_license(self):
+        license_id = self.config['non_open_licenses'][0]
+        data = self._rights_data(license_id)
+        validators.evaluate_rules(self.rules, data, self.errors)
+
+        assert len(self.errors[('license_id',)]) == 1
+        assert self.errors[('license_id',)][0].endswith(
+            'an open license must be provided; got ' + license_id
+        )
+
+    def test_rights_accept_open_license(self):
+        data = self._rights_data('http://creativecommons.org/publicdomain/'
+                                 'mark/1.0/deed.nl')
+        validators.evaluate_rules(self.rules, data, self.errors)
+
+        assert not self.errors[('license_id',)]
+
+    def test_rights_accept_non_public_access(self):
+        data = self._rights_data(self.config['non_open_licenses'][0])
+        data[('access_rights',)] = 'http://publications.europa.eu/resource/' \
+                                   'authority/access-right/NON_PUBLIC'
+        validators.evaluate_rules(self.rules, data, self.errors)
+
+        assert not self.errors[('license_id',)]
+
+    def test_rights_keep_earlier_license_errors(self):
+        data = self._rights_data(self.config['non_open_licenses'][0])
+        self.errors[('license_id',)].append('earlier error')
+        validators.evaluate_rules(self.rules, data, self.errors)
+
+        assert self.errors[('license_id',)] == ['earlier error']
+
+    def _rights_data(self, license_id):
+        return {
+            ('dataset_status',): self.config['available_uri'],
+            ('access_rights',): self.config['public_uri'],
+            ('license_id',): license_id
+        }
+
+
+class TestCommunityIndex(object):
+    """
+    Pins the communities determined by `classify_communities`, which must
+    match those of evaluating every rule of every community.
+    """
+    def setup(self):
+        self.communities = [
+            {'uri': 'https://data.overheid.nl/communities/c',
+             'rules': {'authority': ['authority-1'], 'basis_register': True},
+             'tags': ['tag-1']},
+            {'uri': 'https://data.overheid.nl/communities/a',
+             'rules': {'theme': ['theme-1', 'theme-2']}},
+            {'uri': 'https://data.overheid.nl/communities/c',
+             'rules': {'theme': ['theme-2']}},
+            {'uri': 'https://data.overheid.nl/communities/b',
+             'rules': {'basis_register': False}, 'tags': ['tag-2']}
+        ]
+        self.index = validators.build_community_index(self.communities)
+
+    def test_matches_in_community_order_without_duplicates(self):
+        data = {('theme',): ['theme-2'], ('basis_register',): True}
+        communities = validators.classify_communities(data, ['tag-2'],
+                                                      self.index)
+
+        assert communities == ['https://data.overheid.nl/communities/c',
+                               'https://data.overheid.nl/communities/a',
+                               'https://data.overheid.nl/communities/b']
+
+    def test_matches_single_values_and_tags(self):
+        data = {('authority',): 'authority-1'}
+        communities = validators.classify_communities(data, ['tag-1'],
+                                                      self.index)
+
+        assert communities == ['https://data.overheid.nl/communities/c']
+
+    def test_no_matches(self):
+        data = {('authority',): 'authority-2', ('theme',): 'theme-3'}
+
+        assert validators.classify_communities(data, [], self.index) == []
+
+
+def _validation_config():
+    """
+    Loads the validation section of the `config.json` of this extension.
+
+    :rtype: dict[str, Any]
+    :return: The validation config
+    """
+    filepath = os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                            'config.json')
+
+    with open(filepath, 'r') as config_file:
+        return json.load(config_file)['validation']
@@ -0,0 +1,83 @@
+# encoding: utf-8
+
+
+import unittest
+from ckanext.dataoverheid.logic.rdf import writers
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import RDF, XSD
+
+
+class TestWriters(object):
+    """
+    Verifies that every writer produces a document which rdflib parses into a
+    Graph isomorphic to the serialized triples.
+    """
+    def setup(self):
+        self.namespaces = {'DCAT': dcat, 'DCT': dct}
+        dataset = URIRef('https://data.overheid.nl/dataset/donl-test')
+        distribution = BNode()
+        self.triples = [
+            (dataset, RDF.type, dcat.Dataset),
+            (dataset, dct.title, Literal(u'Tëst "dataset"', lang='nl')),
+            (dataset, dct.description, Literal(u'Line one\nline two \\ end')),
+            (dataset, dct.issued, Literal('2020-01-01T00:00:00',
+                                          datatype=XSD.dateTime)),
+            (dataset, dcat.distribution, distribution),
+            (dataset, URIRef('http://example.org/terms#custom'),
+             Literal('not prefixed')),
+            (distribution, RDF.type, dcat.Distribution),
+            (distribution, dcat.accessURL,
+             URIRef('https://data.overheid.nl/data.csv'))
+        ]
+
+    def test_xml(self):
+        self._assert_isomorphic('xml', 'xml')
+
+    def test_turtle(self):
+        self._assert_isomorphic('turtle', 'turtle')
+
+    def test_n3(self):
+        self._assert_isomorphic('n3', 'n3')
+
+    def test_nt(self):
+        self._assert_isomorphic('nt', 'nt')
+
+    def test_jsonld(self):
+        try:
+            import rdflib_jsonld  # noqa
+        except ImportError:
+            raise unittest.SkipTest('rdflib-jsonld is not installed')
+
+        self._assert_isomorphic('json-ld', 'json-ld')
+
+    def test_invalid_iri_characters_are_escaped(self):
+        subject = URIRef('https://data.overheid.nl/dataset/donl test')
+        triples = [(subject, RDF.type, dcat.Dataset),
+                   (subject, dcat.landingPage,
+                    URIRef('https://data.overheid.nl/{name}|"<test>"^`'))]
+        expected = [(URIRef('https://data.overheid.nl/dataset/donl%20test'),
+                     RDF.type, dcat.Dataset),
+                    (URIRef('https://data.overheid.nl/dataset/donl%20test'),
+                     dcat.landingPage,
+                     URIRef('https://data.overheid.nl/%7Bname%7D%7C%22%3Ctest'
+                            '%3E%22%5E%60'))]
+
+        for output in ['xml', 'turtle', 'nt']:
+            self._assert_isomorphic(output, output, triples, expected)
+
+    def _assert_isomorphic(self, output, rdflib_format, triples=None,
+                           expected=None):
+        triples = self.triples if triples is None else triples
+        graph = Graph()
+        [graph.add(triple) for triple in expected or triples]
+
+        serialization = ''.join(writers.serialize(triples, output,
+                                                  self.namespaces))
+        parsed = Graph().parse(data=serialization, format=rdflib_format)
+
+        assert isomorphic(graph, parsed), serialization
+
+
+dcat = Namespace('http://www.w3.org/ns/dcat#')
+dct = Namespace('http://purl.org/dc/terms/')
@@ -0,0 +1,78 @@
+# encoding: utf-8
+
+
+import json
+import multiprocessing
+import timeit
+import ckan.model as model
+from ckanext.dataoverheid.logic.actions import validate_package, \
+    validation_context
+
+
+def run(path, action, processes, user):
+    """
+    Validates a batch of packages against the package schema without storing
+    them, dividing the batch over a pool of forked processes. Intended for
+    screening an entire harvest before writing it; the `package_validate_many`
+    action validates smaller batches within a single request.
+
+    :param str path: The path of a JSON file holding a list of packages
+    :param str action: The action to validate for, either `'package_create'`
+                       or `'package_update'`
+    :param int processes: The amount of processes validating packages
+    :param str user: The name of the CKAN user validating the packages
+    :rtype: (list of dict[str, Any], float)
+    :return: The name, success and errors of each package, in the given order,
+             and the seconds passed
+    """
+    if action not in ['package_create', 'package_update']:
+        raise ValueError('unsupported action {0}'.format(action))
+
+    with open(path, 'r') as packages_file:
+        packages = json.load(packages_file)
+
+    if not isinstance(packages, list):
+        raise ValueError('{0} does not hold a list of packages'.format(path))
+
+    start = timeit.default_timer()
+
+    # The pool is forked without any database connections to inherit.
+    model.Session.remove()
+    model.meta.engine.dispose()
+    pool = multiprocessing.Pool(processes, _init_process, (user,))
+
+    try:
+        results = pool.map(_validate_in_process,
+                           [(action, package) for package in packages],
+                           chunksize=max(1, len(packages) // (processes * 4)))
+    finally:
+        pool.close()
+        pool.join()
+
+    return results, timeit.default_timer() - start
+
+
+def _init_process(user):
+    """
+    Prepares a forked process for validating packages.
+
+    :param str user: The name of the CKAN user validating the packages
+    :rtype: None
+    """
+    _validation['context'] = validation_context(user)
+
+
+def _validate_in_process(job):
+    """
+    Validates a single package in a forked process.
+
+    :param (str, dict[str, Any]) job: The action and the package
+    :rtype: dict[str, Any]
+    :return: The name, success and errors of the package
+    """
+    action, package = job
+
+    return validate_package(_validation['context'], action, package)
+
+
+_validation = {'context': None}
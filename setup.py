@@ -45,5 +45,8 @@ setup(
         donl-authorization=ckanext.dataoverheid.plugins:AuthorizationPlugin
         donl-rdf=ckanext.dataoverheid.plugins:RDFPlugin
         donl-interface=ckanext.dataoverheid.plugins:InterfacePlugin
+
+        [paste.paster_command]
+        dataoverheid=ckanext.dataoverheid.commands:DataOverheidCommand
     '''
 )